@@ -1,12 +1,16 @@
 from flask import Flask
-from extensions import db, jwt, cors
+from extensions import db, jwt, cors, ollama, ollama_pool
+from services.backend_pool import parse_base_urls
+from services.generation_cache import generation_cache
+from services.job_queue import batch_queue, generation_queue
+from services.database import configure_database
+from services.logging_setup import configure_logging, parse_levels
+from services.passwords import DEFAULT_METHOD, password_hasher
+from services.identity import identity_cache
+from services.exports import exports
+from services import metrics
 import os
 from dotenv import load_dotenv
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from routes.auth import auth_bp
-from routes.content import content_bp
-from routes.test_routes import test_bp
 
 # Load environment variables
 load_dotenv()
@@ -15,8 +19,18 @@ def create_app():
     app = Flask(__name__)
     
     # Configure the app
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:@localhost/dbedu'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Logging: JSON lines on stdout through a background queue. LOG_LEVELS sets
+    # per-logger levels ("services.ai_service=DEBUG,werkzeug=WARNING") and
+    # LOG_PAYLOADS=true adds prompts, bodies and LLM responses at DEBUG
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_LEVELS'] = parse_levels(os.getenv('LOG_LEVELS'))
+    app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json')
+    app.config['LOG_PAYLOADS'] = os.getenv('LOG_PAYLOADS', 'false').lower() == 'true'
+    configure_logging(app)
+    
+    # Database: DATABASE_URL or DB_* variables, pool settings and optional
+    # DATABASE_REPLICA_URL (see services/database.py)
+    configure_database(app)
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
     
     # CORS configuration
@@ -26,23 +40,88 @@ def create_app():
     app.config['CORS_METHODS'] = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
     app.config['CORS_ALLOW_HEADERS'] = ['Content-Type', 'Authorization']
     
+    # Ollama client configuration
+    app.config['OLLAMA_BASE_URL'] = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+    # Comma-separated list of Ollama hosts; defaults to OLLAMA_BASE_URL alone
+    app.config['OLLAMA_BASE_URLS'] = parse_base_urls(os.getenv('OLLAMA_BASE_URLS')) or [app.config['OLLAMA_BASE_URL']]
+    app.config['OLLAMA_PROBE_INTERVAL'] = float(os.getenv('OLLAMA_PROBE_INTERVAL', '15'))
+    app.config['OLLAMA_MODELS_TTL'] = float(os.getenv('OLLAMA_MODELS_TTL', '60'))
+    # Circuit breaker: open after N consecutive failures, retry after M seconds
+    app.config['OLLAMA_BREAKER_FAILURES'] = int(os.getenv('OLLAMA_BREAKER_FAILURES', '5'))
+    app.config['OLLAMA_BREAKER_RESET'] = float(os.getenv('OLLAMA_BREAKER_RESET', '30'))
+    app.config['OLLAMA_POOL_SIZE'] = int(os.getenv('OLLAMA_POOL_SIZE', '10'))
+    app.config['OLLAMA_CONNECT_TIMEOUT'] = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '3.05'))
+    app.config['OLLAMA_TAGS_TIMEOUT'] = float(os.getenv('OLLAMA_TAGS_TIMEOUT', '10'))
+    app.config['OLLAMA_GENERATE_TIMEOUT'] = float(os.getenv('OLLAMA_GENERATE_TIMEOUT', '120'))
+    
+    # Generation cache configuration
+    app.config['GENERATION_CACHE_SIZE'] = int(os.getenv('GENERATION_CACHE_SIZE', '256'))
+    app.config['GENERATION_CACHE_TTL'] = float(os.getenv('GENERATION_CACHE_TTL', '3600'))
+    app.config['GENERATION_CACHE_WARM'] = os.getenv('GENERATION_CACHE_WARM', 'true').lower() == 'true'
+    
+    # Asynchronous generation jobs
+    app.config['GENERATION_WORKERS'] = int(os.getenv('GENERATION_WORKERS', '4'))
+    app.config['GENERATION_QUEUE_SIZE'] = int(os.getenv('GENERATION_QUEUE_SIZE', '100'))
+    
+    # Batch items: one pool shared by every /generate/batch request
+    app.config['BATCH_WORKERS'] = int(os.getenv('BATCH_CONCURRENCY', '4'))
+    app.config['BATCH_QUEUE_SIZE'] = int(os.getenv('BATCH_QUEUE_SIZE', '100'))
+    
+    # Password hashing: werkzeug method with its cost ("scrypt:32768:8:1",
+    # "pbkdf2:sha256:600000"), run on a bounded pool of hashing threads
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    app.config['PASSWORD_HASH_QUEUE_SIZE'] = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', '64'))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+    
+    # PDF/DOCX exports, rendered in the background into a disk cache
+    app.config['EXPORT_DIR'] = os.getenv('EXPORT_DIR') or None
+    app.config['EXPORT_CACHE_TTL'] = float(os.getenv('EXPORT_CACHE_TTL', str(7 * 24 * 3600)))
+    app.config['EXPORT_WORKERS'] = int(os.getenv('EXPORT_WORKERS', '2'))
+    app.config['EXPORT_QUEUE_SIZE'] = int(os.getenv('EXPORT_QUEUE_SIZE', '20'))
+    
+    # Profiles of JWT-authenticated users, cached per process
+    app.config['IDENTITY_CACHE_SIZE'] = int(os.getenv('IDENTITY_CACHE_SIZE', '1024'))
+    app.config['IDENTITY_CACHE_TTL'] = float(os.getenv('IDENTITY_CACHE_TTL', '60'))
+    
+    # Accounts allowed to import rosters through the API
+    app.config['ADMIN_EMAILS'] = [
+        email.strip() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()
+    ]
+    
+    # Prometheus metrics at /metrics; METRICS_ENABLED=false skips SQL timing
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    
     # Initialize extensions
     db.init_app(app)
     jwt.init_app(app)
     cors.init_app(app)
+    ollama.init_app(app)
+    ollama_pool.init_app(app)
+    generation_queue.init_app(app)
+    batch_queue.init_app(app, prefix='BATCH')
+    password_hasher.init_app(app)
+    identity_cache.init_app(app)
+    exports.init_app(app)
+    metrics.init_app(app)
     
     # Import and register blueprints
     from routes.auth import auth_bp
     from routes.content import content_bp
     from routes.test_routes import test_bp
+    from routes.metrics import metrics_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(content_bp, url_prefix='/api/content')
     app.register_blueprint(test_bp, url_prefix='/api/test')
+    app.register_blueprint(metrics_bp)
+    
+    # Maintenance CLI commands; the schema is created with `flask init-db`
+    from cli import register_commands
+    register_commands(app)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Warmed from the database in the background on the first request
+    generation_cache.init_app(app)
     
     return app
 
@@ -0,0 +1,216 @@
+"""Local stand-in for the Ollama HTTP API, for benchmarks without a GPU.
+
+Serves /api/tags and /api/generate (blocking and NDJSON streaming) with a
+configurable first-token latency, token rate, error rate and rate of
+malformed outputs, and fills in Ollama's timing fields.
+
+    python benchmarks/fake_ollama.py --port 11435 --latency 0.2 --tokens-per-second 40
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+QCM_TEMPLATE = """QUESTION: Which statement about {topic} is correct (variant {n})?
+OPTIONS:
+1. The first statement about {topic}
+2. The second statement about {topic}
+3. The third statement about {topic}
+4. The fourth statement about {topic}
+CORRECT_ANSWER: {answer}
+EXPLANATION: Statement {answer} is the one that matches the definition of {topic}."""
+
+# Outputs per structured kind, recognised from the ``format`` schema fields
+JSON_OUTPUTS = {
+    'questions': lambda topic: {'questions': [{
+        'question': f'What is {topic}?',
+        'options': ['A', 'B', 'C', 'D'],
+        'correct_answer': 0,
+        'explanation': f'A describes {topic}.'
+    }]},
+    'steps': lambda topic: {
+        'title': f'Exercise on {topic}', 'description': 'Practice.', 'steps': ['Read', 'Solve'],
+        'solution': 'The solution.', 'hints': ['Start simple']
+    },
+    'key_points': lambda topic: {
+        'title': f'Summary of {topic}', 'key_points': ['Point'], 'main_concepts': ['Concept'],
+        'examples': ['Example'], 'conclusion': 'Conclusion.'
+    },
+}
+
+
+@dataclass
+class FakeOllamaConfig:
+    latency: float = 0.05
+    tokens_per_second: float = 0.0
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    models: tuple = ('mistral:latest',)
+    seed: int = 0
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = FakeOllamaConfig()
+    counter = 0
+    random = random.Random(0)
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/api/tags':
+            return self._send_json(404, {'error': 'not found'})
+        self._send_json(200, {'models': [{'name': name} for name in self.config.models]})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path != '/api/generate':
+            return self._send_json(404, {'error': 'not found'})
+        if body.get('model') not in self.config.models:
+            return self._send_json(404, {'error': f"model '{body.get('model')}' not found"})
+
+        with self.lock:
+            type(self).counter += 1
+            n = self.counter
+            roll_error = self.random.random()
+            roll_malformed = self.random.random()
+
+        time.sleep(self.config.latency)
+        if roll_error < self.config.error_rate:
+            return self._send_json(503, {'error': 'server busy, please try again'})
+
+        text = self._output(body, n, malformed=roll_malformed < self.config.malformed_rate)
+        tokens = _tokenize(text)
+        timings = {
+            'load_duration': 0,
+            'prompt_eval_count': len(body.get('prompt', '').split()),
+            'prompt_eval_duration': int(self.config.latency * 1e9),
+            'eval_count': len(tokens),
+        }
+        started = time.perf_counter()
+
+        if body.get('stream', True):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for token in self._paced(tokens):
+                self._write_chunk({'model': body['model'], 'response': token, 'done': False})
+            eval_duration = time.perf_counter() - started
+            self._write_chunk(dict(timings, model=body['model'], response='', done=True,
+                                   eval_duration=int(eval_duration * 1e9),
+                                   total_duration=int((eval_duration + self.config.latency) * 1e9)))
+            self.wfile.write(b'0\r\n\r\n')
+            return
+
+        for _ in self._paced(tokens):
+            pass
+        eval_duration = time.perf_counter() - started
+        self._send_json(200, dict(timings, model=body['model'], response=text, done=True,
+                                  eval_duration=max(1, int(eval_duration * 1e9)),
+                                  total_duration=int((eval_duration + self.config.latency) * 1e9)))
+
+    def _write_chunk(self, payload: Dict[str, Any]) -> None:
+        data = (json.dumps(payload) + '\n').encode()
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def _paced(self, tokens: List[str]) -> Iterator[str]:
+        delay = 1 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0
+        for token in tokens:
+            if delay:
+                time.sleep(delay)
+            yield token
+
+    def _output(self, body: Dict[str, Any], n: int, malformed: bool) -> str:
+        topic = _topic(body.get('prompt', ''))
+        schema = body.get('format')
+        if isinstance(schema, dict) or schema == 'json':
+            if malformed:
+                return '{"title": "truncated'
+            properties = schema.get('properties', {}) if isinstance(schema, dict) else {}
+            for field, build in JSON_OUTPUTS.items():
+                if field in properties:
+                    return json.dumps(build(topic))
+            return json.dumps(JSON_OUTPUTS['questions'](topic))
+        if malformed:
+            return f"Here is a question about {topic}: [WRITE A QUESTION]"
+        return QCM_TEMPLATE.format(topic=topic, n=n, answer=n % 4 + 1)
+
+
+def _topic(prompt: str) -> str:
+    for marker in (' about ', ' on '):
+        if marker in prompt:
+            return prompt.split(marker, 1)[1].split(' for ', 1)[0].strip(' "')[:60]
+    return 'the topic'
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split into word-sized tokens that concatenate back to ``text``."""
+    tokens, current = [], ''
+    for char in text:
+        current += char
+        if char in ' \n':
+            tokens.append(current)
+            current = ''
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def start_fake_ollama(config: FakeOllamaConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start the fake server in a daemon thread; ``port=0`` picks a free port."""
+    handler = type('ConfiguredFakeOllamaHandler', (FakeOllamaHandler,), {
+        'config': config, 'counter': 0, 'random': random.Random(config.seed), 'lock': threading.Lock()
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-ollama', daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='Output token rate (0 = instant)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 503 answers')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fraction of unparseable outputs')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def config_from_args(args) -> FakeOllamaConfig:
+    return FakeOllamaConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                            error_rate=args.error_rate, malformed_rate=args.malformed_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_fake_ollama(config_from_args(args), args.host, args.port)
+    print(f"Fake Ollama listening on http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
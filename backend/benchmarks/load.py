@@ -0,0 +1,223 @@
+"""End-to-end load benchmark of the backend against a fake Ollama.
+
+By default the app runs in-process on a threaded WSGI server, with a fresh
+SQLite database and the fake Ollama of benchmarks/fake_ollama.py, so the
+numbers only depend on this code. Point --database-url at MySQL to include
+the real database, or --base-url at an already running backend.
+
+    cd backend
+    python benchmarks/load.py --scenario generate,login --requests 500 --concurrency 16
+    python benchmarks/load.py --scenario generate --tokens-per-second 40 --error-rate 0.05
+    python benchmarks/load.py --database-url mysql+pymysql://root:@localhost/dbedu_bench --reset-db
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import add_arguments, config_from_args, start_fake_ollama  # noqa: E402
+
+BENCH_PASSWORD = 'benchmark-password'
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def start_backend(args) -> str:
+    """Run the app in this process and return its base URL."""
+    fake = start_fake_ollama(config_from_args(args))
+    os.environ['OLLAMA_BASE_URL'] = f"http://127.0.0.1:{fake.server_port}"
+    os.environ.pop('OLLAMA_BASE_URLS', None)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('LOG_LEVELS', 'werkzeug=WARNING')
+    os.environ.setdefault('GENERATION_CACHE_WARM', 'false')
+    # No backoff sleeps inflating the latencies unless asked for
+    os.environ.setdefault('OLLAMA_RETRY_BASE_DELAY', '0')
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='educato-bench-')}/bench.db"
+    os.environ['DATABASE_URL'] = database_url
+
+    # Imported only now: the Ollama and database settings are read at import
+    from werkzeug.serving import make_server
+    from app import create_app
+    from extensions import db
+    from models.models import User
+
+    app = create_app()
+    with app.app_context():
+        if args.reset_db or not args.database_url:
+            db.drop_all()
+        db.create_all()
+        # The content routes run as user 1 in development mode
+        if db.session.get(User, 1) is None:
+            user = User(id=1, username='bench', email='bench@example.com')
+            user.set_password(BENCH_PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-wsgi', daemon=True).start()
+    print(f"Backend on http://127.0.0.1:{server.server_port} "
+          f"(database {database_url}, fake Ollama on port {fake.server_port})")
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def scenario_generate(args, stream: bool = False) -> Callable[[requests.Session, int], requests.Response]:
+    # Subjects of their own per scenario and run: generate-stream must not
+    # be served from the cache filled by generate
+    prefix = f"{'stream ' if stream else ''}subject {int(time.time() * 1000)}"
+
+    def call(session, i):
+        payload = {
+            'subject': f"{prefix} {i % args.distinct_subjects if args.distinct_subjects else i}",
+            'grade': 'grade 5',
+            'fresh': args.fresh,
+            'stream': stream
+        }
+        response = session.post(f"{args.base_url}/api/content/generate", json=payload,
+                                stream=stream, timeout=args.timeout)
+        if stream:
+            for _ in response.iter_lines():
+                pass
+        return response
+    return call
+
+
+def scenario_register(args) -> Callable[[requests.Session, int], requests.Response]:
+    run_id = int(time.time() * 1000)
+
+    def call(session, i):
+        return session.post(f"{args.base_url}/api/auth/register", json={
+            'username': f"bench-{run_id}-{i}",
+            'email': f"bench-{run_id}-{i}@example.com",
+            'password': BENCH_PASSWORD
+        }, timeout=args.timeout)
+    return call
+
+
+def scenario_login(args) -> Callable[[requests.Session, int], requests.Response]:
+    email = f"bench-login-{int(time.time() * 1000)}@example.com"
+    requests.post(f"{args.base_url}/api/auth/register", json={
+        'username': email.split('@')[0], 'email': email, 'password': BENCH_PASSWORD
+    }, timeout=args.timeout)
+
+    def call(session, i):
+        return session.post(f"{args.base_url}/api/auth/login",
+                            json={'email': email, 'password': BENCH_PASSWORD}, timeout=args.timeout)
+    return call
+
+
+SCENARIOS = {
+    'generate': scenario_generate,
+    'generate-stream': lambda args: scenario_generate(args, stream=True),
+    'register': scenario_register,
+    'login': scenario_login,
+}
+
+
+def run_scenario(name: str, args) -> Dict[str, Any]:
+    call = SCENARIOS[name](args)
+    local = threading.local()
+
+    def one(i: int) -> Tuple[float, str]:
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            status = str(call(session, i).status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return time.perf_counter() - started, status
+
+    # Warm-up requests are not measured
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(-args.warmup, 0)))
+        started = time.perf_counter()
+        results = list(executor.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    statuses = Counter(status for _, status in results)
+    ok = sum(count for status, count in statuses.items() if status.startswith('2'))
+    return {
+        'scenario': name,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'ok': ok,
+        'errors': args.requests - ok,
+        'statuses': dict(statuses),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 2),
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2)
+        }
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report['latency_ms']
+    print(f"\n{report['scenario']}: {report['requests']} requests, concurrency {report['concurrency']}")
+    print(f"  throughput  {report['throughput_rps']:.1f} req/s over {report['elapsed_s']:.2f} s")
+    print(f"  latency ms  p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+          f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}  mean {latency['mean']:.1f}")
+    print(f"  statuses    {report['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='generate',
+                        help=f"Comma-separated scenarios: {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests before each scenario')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--base-url', help='Benchmark a running backend instead of an in-process one')
+    parser.add_argument('--database-url', help='Database of the in-process backend (default: temporary SQLite)')
+    parser.add_argument('--reset-db', action='store_true', help='Drop and recreate the tables of --database-url')
+    parser.add_argument('--distinct-subjects', type=int, default=0,
+                        help='Cycle through N subjects so the generation cache can hit (0 = all distinct)')
+    parser.add_argument('--fresh', action='store_true', help='Bypass the generation cache')
+    parser.add_argument('--json', action='store_true', help='Print the reports as JSON')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenario.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if not args.base_url:
+        args.base_url = start_backend(args)
+
+    reports = [run_scenario(name, args) for name in names]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report)
+
+
+if __name__ == '__main__':
+    main()
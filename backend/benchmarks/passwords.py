@@ -0,0 +1,95 @@
+"""Password hashing cost benchmark: logins per second per core.
+
+For each werkzeug method/cost, measures the latency of one verification and
+the verification throughput of a PasswordHasher pool, so a cost can be
+picked knowing what it does to login capacity. Pair it with
+``load.py --scenario login`` for the end-to-end numbers.
+
+    cd backend
+    python benchmarks/passwords.py
+    python benchmarks/passwords.py --methods scrypt:16384:8:1,pbkdf2:sha256:600000 --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.passwords import PasswordHasher  # noqa: E402
+
+DEFAULT_METHODS = (
+    'pbkdf2:sha256:200000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+)
+PASSWORD = 'correct horse battery staple'
+
+
+def bench_method(method: str, workers: int, duration: float, samples: int) -> dict:
+    hasher = PasswordHasher(method=method, max_workers=workers, max_pending=workers * 4, timeout=60)
+    stored = hasher.hash(PASSWORD)
+
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.verify(stored, PASSWORD)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # As many callers as pool threads, like request threads logging in at once
+    deadline = time.perf_counter() + duration
+
+    def caller(_):
+        done = 0
+        while time.perf_counter() < deadline:
+            hasher.verify(stored, PASSWORD)
+            done += 1
+        return done
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        verified = sum(executor.map(caller, range(workers)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    cores = min(workers, os.cpu_count() or 1)
+    return {
+        'method': method,
+        'hash_length': len(stored),
+        'verify_ms': round(statistics.median(latencies), 2),
+        'workers': workers,
+        'logins_per_s': round(verified / elapsed, 1),
+        'logins_per_s_per_core': round(verified / elapsed / cores, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', default=','.join(DEFAULT_METHODS),
+                        help='Comma-separated werkzeug methods to compare')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hashing threads')
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds of throughput measurement per method')
+    parser.add_argument('--samples', type=int, default=5, help='Single verifications timed for the latency')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    results = [bench_method(method.strip(), args.workers, args.duration, args.samples)
+               for method in args.methods.split(',') if method.strip()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.workers} hashing threads, {os.cpu_count()} CPUs")
+    print(f"{'method':<24} {'verify ms':>10} {'logins/s':>10} {'per core':>10} {'hash len':>9}")
+    for result in results:
+        print(f"{result['method']:<24} {result['verify_ms']:>10.1f} {result['logins_per_s']:>10.1f} "
+              f"{result['logins_per_s_per_core']:>10.1f} {result['hash_length']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Cold-start benchmark of the backend.
+
+Starts fresh Python processes that import ``app`` and call ``create_app()``
+and reports how long each phase takes, i.e. what every WSGI worker fork or
+test process pays before serving anything.
+
+    cd backend
+    python benchmarks/startup.py --runs 20
+    DATABASE_URL=mysql+pymysql://root:@localhost/dbedu python benchmarks/startup.py
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported, 'total': created - start}))
+"""
+
+
+def run_once(env):
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"App startup failed:\n{result.stderr}")
+    # create_app may print; the timings are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='Number of cold starts to measure')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite://')
+
+    # The first run also warms the OS file cache and writes the .pyc files
+    run_once(env)
+    samples = [run_once(env) for _ in range(args.runs)]
+
+    print(f"Cold starts: {args.runs} (DATABASE_URL={env['DATABASE_URL']})")
+    for phase in ('import', 'create_app', 'total'):
+        values = sorted(sample[phase] * 1000 for sample in samples)
+        print(f"  {phase:<10} min {values[0]:8.1f} ms   median {statistics.median(values):8.1f} ms   "
+              f"max {values[-1]:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import json
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import func, update
+
+from extensions import db
+from models.models import Request
+from services.structured_content import backfill_structured_data
+from services.user_import import DEFAULT_CHUNK_SIZE, FORMATS, detect_format, import_users, iter_roster
+from services.user_stats import reconcile_user_stats
+
+
+def register_commands(app):
+    """Register the maintenance commands (run with ``flask --app app <command>``)."""
+
+    @app.cli.command('init-db')
+    @click.option('--drop', is_flag=True, help='Drop every table first (destroys all data).')
+    def init_db(drop):
+        """Create the database tables that do not exist yet."""
+        if drop:
+            db.drop_all()
+            click.echo("Dropped all tables")
+        db.create_all()
+        click.echo("Database tables created")
+
+    @app.cli.command('backfill-structured')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per transaction.')
+    def backfill_structured(batch_size):
+        """Store the structured form of contents generated before it was persisted."""
+        stats = backfill_structured_data(batch_size=batch_size)
+        click.echo(
+            f"Updated {stats['updated']} contents in {stats['batches']} batches "
+            f"({stats['unparseable']} could not be parsed)"
+        )
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--user-id', type=int, default=None, help='Only reconcile this user.')
+    def reconcile_stats(user_id):
+        """Recompute the user_stats counters from the contents table."""
+        fixed = reconcile_user_stats(user_id=user_id)
+        click.echo(f"Reconciled user stats: {fixed} rows created or corrected")
+
+    @app.cli.command('fail-stale-jobs')
+    @click.option('--older-than', default=30, show_default=True,
+                  help='Minutes since the job was queued or started; 0 fails every unfinished job.')
+    def fail_stale_jobs(older_than):
+        """Mark generation jobs lost by a stopped worker as failed.
+
+        Jobs live in the memory of the process that queued them: after a
+        restart, their requests would stay queued or running forever.
+        """
+        cutoff = datetime.utcnow() - timedelta(minutes=older_than)
+        result = db.session.execute(
+            update(Request)
+            .where(Request.status.in_(('queued', 'running')),
+                   func.coalesce(Request.started_at, Request.date_created) <= cutoff)
+            .values(status='failed', error='Interrupted: the worker running this job stopped',
+                    finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        click.echo(f"Marked {result.rowcount} stale jobs as failed")
+
+    @app.cli.command('import-users')
+    @click.argument('roster', type=click.File('rb'))
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+                  help='Roster format (default: from the file extension).')
+    @click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Rows per transaction.')
+    @click.option('--report', type=click.File('w'), default=None,
+                  help='Write one JSON line per row to this file ("-" for stdout).')
+    def import_users_command(roster, fmt, chunk_size, report):
+        """Create the accounts of a CSV or NDJSON roster (columns: username, email, password)."""
+        fmt = fmt or detect_format(roster.name)
+        if fmt is None:
+            raise click.UsageError('Cannot tell the roster format from its name, pass --format')
+        counts = {'created': 0, 'duplicate': 0, 'invalid': 0}
+        for result in import_users(iter_roster(roster, fmt), chunk_size=chunk_size):
+            counts[result['status']] += 1
+            if report is not None:
+                report.write(json.dumps(result) + '\n')
+            elif result['status'] != 'created':
+                click.echo(f"line {result['line']}: {result['status']}: {result.get('error')}", err=True)
+        click.echo(
+            f"Created {counts['created']} users, {counts['duplicate']} duplicates, {counts['invalid']} invalid rows",
+            err=report is not None and report.name == '<stdout>'
+        )
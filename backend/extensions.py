@@ -2,10 +2,15 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from services.ollama_client import OllamaClient
+from services.backend_pool import BackendPool, default_base_urls
+from services.database import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
+ollama = OllamaClient()
+ollama_pool = BackendPool(ollama, default_base_urls())
 cors = CORS(
     resources={r"/*": {
         "origins": ["http://localhost:3000"],
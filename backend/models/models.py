@@ -1,6 +1,16 @@
 from extensions import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.passwords import password_hasher
+
+
+def utc_isoformat(value):
+    """ISO 8601 string of a naive UTC datetime, marked as UTC ("...Z").
+
+    Every timestamp is stored as naive UTC (datetime.utcnow); without the
+    zone, browsers would read it as local time.
+    """
+    return value.isoformat() + 'Z' if value else None
+
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -8,34 +18,50 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    # scrypt hashes are ~160 characters
+    password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     requests = db.relationship('Request', backref='user', lazy=True)
     contents = db.relationship('Content', backref='user', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = password  # Store as plain text
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return self.password_hash == password  # Direct comparison
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Plain-text passwords and outdated hashes are upgraded at the next login."""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def to_dict(self):
         return {
             'id': self.id,
             'username': self.username,
             'email': self.email,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': utc_isoformat(self.created_at)
         }
 
 class Request(db.Model):
     __tablename__ = 'requests'
+    __table_args__ = (
+        # History filters on topic/level
+        db.Index('ix_requests_user_topic_level', 'user_id', 'topic', 'level'),
+        db.Index('ix_requests_user_date', 'user_id', 'date_created', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     topic = db.Column(db.String(200), nullable=False)
     level = db.Column(db.String(50), nullable=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    # Asynchronous generation jobs ('queued', 'running', 'completed', 'failed')
+    job_id = db.Column(db.String(36), unique=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default='completed')
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
     contents = db.relationship('Content', backref='request', lazy=True, cascade='all, delete-orphan')
 
     def to_dict(self):
@@ -44,12 +70,25 @@ class Request(db.Model):
             'user_id': self.user_id,
             'topic': self.topic,
             'level': self.level,
-            'date_created': self.date_created.isoformat() if self.date_created else None,
+            'date_created': utc_isoformat(self.date_created),
+            'job_id': self.job_id,
+            'status': self.status,
+            'started_at': utc_isoformat(self.started_at),
+            'finished_at': utc_isoformat(self.finished_at),
+            'error': self.error,
             'contents': [content.to_dict() for content in self.contents]
         }
 
 class Content(db.Model):
     __tablename__ = 'contents'
+    __table_args__ = (
+        # Keyset pagination of the history, with and without a type filter
+        db.Index('ix_contents_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_contents_user_type_created', 'user_id', 'content_type', 'created_at', 'id'),
+        # History filtered on topic/level: reached from the matching requests
+        # (ix_requests_user_topic_level) and read in keyset order per request
+        db.Index('ix_contents_request_created', 'request_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     request_id = db.Column(db.Integer, db.ForeignKey('requests.id', ondelete='CASCADE'), nullable=False)
@@ -57,6 +96,10 @@ class Content(db.Model):
     title = db.Column(db.String(200), nullable=False)
     content_type = db.Column(db.String(50), nullable=False)  # e.g., 'qcm', 'exercise', 'summary'
     content_data = db.Column(db.Text, nullable=False)
+    # Parsed form of content_data, written once at generation time
+    structured_data = db.Column(db.JSON(none_as_null=True))
+    # Prompt template the content was generated from (services/prompts.py)
+    prompt_version = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -68,6 +111,34 @@ class Content(db.Model):
             'title': self.title,
             'content_type': self.content_type,
             'content_data': self.content_data,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+            'structured_data': self.structured_data,
+            'prompt_version': self.prompt_version,
+            'created_at': utc_isoformat(self.created_at),
+            'updated_at': utc_isoformat(self.updated_at)
+        }
+
+
+class UserStats(db.Model):
+    """Per-user generation counters, updated with each Content insert."""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_generations = db.Column(db.Integer, nullable=False, default=0)
+    qcm_count = db.Column(db.Integer, nullable=False, default=0)
+    exercise_count = db.Column(db.Integer, nullable=False, default=0)
+    summary_count = db.Column(db.Integer, nullable=False, default=0)
+    last_generation_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'total_generations': self.total_generations,
+            'by_type': {
+                'qcm': self.qcm_count,
+                'exercise': self.exercise_count,
+                'summary': self.summary_count
+            },
+            'last_generation_at': utc_isoformat(self.last_generation_at),
+            'updated_at': utc_isoformat(self.updated_at)
+        }
@@ -1,11 +1,20 @@
+import logging
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token
 from models.models import User
 from extensions import db
+from services.logging_setup import log_payload
+from services.identity import admin_required, current_user_profile, identity_cache, identity_required
+from services.passwords import PasswordHasherBusy
+from services.user_import import (
+    DEFAULT_CHUNK_SIZE as DEFAULT_IMPORT_CHUNK_SIZE, FORMATS as IMPORT_FORMATS,
+    detect_format, import_users, iter_roster, summarize
+)
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+logger = logging.getLogger(__name__)
+
 def handle_options_request():
     """Handle OPTIONS request for CORS preflight."""
     response = jsonify({'status': 'ok'})
@@ -21,61 +30,59 @@ def register():
         return handle_options_request()
         
     try:
-        print("\n=== Register request received ===")
-        print("Headers:", dict(request.headers))
-        print("Content-Type:", request.content_type)
-        
         data = request.get_json()
-        print("Request data:", data)
+        log_payload(logger, "Register request body", data)
         
         if not data:
-            print("No data provided")
+            logger.info("Rejected registration: no data provided")
             return jsonify({'error': 'No data provided'}), 400
             
         required_fields = ['username', 'email', 'password']
         for field in required_fields:
             if field not in data:
-                print(f"Missing field: {field}")
+                logger.info("Rejected registration: missing field %s", field)
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
         # Check if email already exists
         existing_email = User.query.filter_by(email=data['email']).first()
         if existing_email:
-            print(f"Email already registered: {data['email']}")
+            logger.info("Rejected registration: email already registered")
             return jsonify({'error': 'Email already registered'}), 400
             
         # Check if username already exists
         existing_username = User.query.filter_by(username=data['username']).first()
         if existing_username:
-            print(f"Username already taken: {data['username']}")
+            logger.info("Rejected registration: username already taken")
             return jsonify({'error': 'Username already taken'}), 400
         
         # Create new user
         user = User(
             username=data['username'],
-            email=data['email'],
-            password_hash=data['password']
+            email=data['email']
         )
+        user.set_password(data['password'])
         
-        print("Creating new user:", user.to_dict())
         db.session.add(user)
         db.session.commit()
+        logger.info("User registered", extra={'user_id': user.id})
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=str(user.id))
         
         response_data = {
             'message': 'User registered successfully',
             'token': access_token,
             'user': user.to_dict()
         }
-        print("Registration successful:", response_data)
-        
         return jsonify(response_data), 201
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        logger.warning("Registration rejected: password hasher busy")
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
-        print("Registration error:", str(e))
+        logger.exception("Registration error")
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST', 'OPTIONS'])
@@ -84,79 +91,70 @@ def login():
         return handle_options_request()
         
     try:
-        print("\n=== Login request received ===")
-        print("Headers:", dict(request.headers))
-        print("Content-Type:", request.content_type)
-        
         data = request.get_json()
-        print("Request data:", data)
+        log_payload(logger, "Login request body", data)
         
         if not data:
-            print("No data provided")
+            logger.info("Rejected login: no data provided")
             return jsonify({'error': 'No data provided'}), 400
             
         if 'email' not in data or 'password' not in data:
-            print("Missing email or password")
+            logger.info("Rejected login: missing email or password")
             return jsonify({'error': 'Email and password are required'}), 400
             
         user = User.query.filter_by(email=data['email']).first()
-        print(f"User found: {user is not None}")
         
         if user:
-            print(f"User details: {user.to_dict()}")
-            print(f"Attempting to verify password: {data['password']}")
-            
             if not user or not user.check_password(data['password']):
-                print('Password verification failed (plain text)')
+                logger.info("Login failed: wrong password", extra={'user_id': user.id})
                 return jsonify({'message': 'Invalid credentials'}), 401
             
-            access_token = create_access_token(identity=user.id)
+            # Mettre à niveau les mots de passe en clair ou hachés avec un ancien coût
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(data['password'])
+                    db.session.commit()
+                    identity_cache.invalidate(user.id)
+                    logger.info("Password rehashed", extra={'user_id': user.id})
+                except Exception:
+                    # Ce n'est pas une raison de refuser la connexion
+                    db.session.rollback()
+                    logger.warning("Password rehash failed", extra={'user_id': user.id}, exc_info=True)
+            
+            access_token = create_access_token(identity=str(user.id))
             response_data = {
                 'token': access_token,
                 'user': user.to_dict()
             }
-            print("Login successful:", response_data)
+            logger.info("Login successful", extra={'user_id': user.id})
             return jsonify(response_data), 200
         
-        print("Invalid credentials")
+        logger.info("Login failed: unknown email")
         return jsonify({'error': 'Invalid credentials'}), 401
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        logger.warning("Login rejected: password hasher busy")
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        print("Login error:", str(e))
-        import traceback
-        print("Traceback:", traceback.format_exc())
+        db.session.rollback()
+        logger.exception("Login error")
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/me', methods=['GET', 'OPTIONS'])
-@jwt_required()
+@identity_required
 def get_current_user():
     if request.method == 'OPTIONS':
         return handle_options_request()
         
     try:
-        print("\n=== Headers reçus (auth/me) ===")
-        print(dict(request.headers))
-        
-        user_id = get_jwt_identity()
-        print(f"User ID from token: {user_id}")
-        
-        if not user_id:
-            print("No user ID found in token")
-            return jsonify({'error': 'No user ID found in token'}), 401
-            
-        user = User.query.get(user_id)
-        if not user:
-            print(f"User not found for ID: {user_id}")
-            return jsonify({'error': 'User not found'}), 404
-        
-        print(f"User found: {user.to_dict()}")
-        return jsonify(user.to_dict()), 200
+        # Profil résolu par identity_required, sans requête SQL si déjà en cache
+        profile = current_user_profile()
+        profile.pop('is_active', None)
+        return jsonify(profile), 200
         
     except Exception as e:
-        print(f"Error in get_current_user: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in get_current_user")
         return jsonify({'error': 'Failed to get user information'}), 500
 
 @auth_bp.route('/reset-password', methods=['POST', 'OPTIONS'])
@@ -165,7 +163,6 @@ def reset_password():
         return handle_options_request()
         
     try:
-        print("\n=== Password reset request received ===")
         data = request.get_json()
         
         if not data or 'email' not in data or 'new_password' not in data:
@@ -175,19 +172,67 @@ def reset_password():
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
-        print(f"Resetting password for user: {user.username}")
+        logger.info("Resetting password", extra={'user_id': user.id})
         
         # Update the password
-        user.password = data['new_password']
+        user.set_password(data['new_password'])
         
         db.session.commit()
+        identity_cache.invalidate(user.id)
         
         return jsonify({
             'message': 'Password reset successfully',
             'user': user.to_dict()
         }), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
-        print("Password reset error:", str(e))
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        logger.exception("Password reset error")
+        return jsonify({'error': str(e)}), 500
+
+@auth_bp.route('/import-users', methods=['POST', 'OPTIONS'])
+@admin_required
+def import_roster():
+    """Create accounts in bulk from a CSV or NDJSON roster (administrators only).
+
+    The file is sent as the ``file`` field of a multipart form or as the raw
+    body (Content-Type text/csv or application/x-ndjson); ``?format=`` overrides
+    the detection. Columns: username, email, password. The report has the
+    counts and the rows that were not created; ``flask import-users
+    --report`` writes every row.
+    """
+    if request.method == 'OPTIONS':
+        return handle_options_request()
+        
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(IMPORT_FORMATS)}"}), 400
+        
+        chunk_size = request.args.get('chunk_size', DEFAULT_IMPORT_CHUNK_SIZE, type=int)
+        if chunk_size < 1:
+            return jsonify({'error': 'chunk_size must be positive'}), 400
+        
+        # Le fichier est lu et inséré par paquets, sans être chargé en mémoire
+        report = summarize(import_users(iter_roster(stream, fmt), chunk_size=chunk_size))
+        logger.info("Imported roster", extra={
+            'created': report['created'], 'duplicate': report['duplicate'], 'invalid': report['invalid']
+        })
+        return jsonify(report), 200
+        
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Roster import error")
+        return jsonify({'error': str(e)}), 500
@@ -1,31 +1,194 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.models import Request, Content
+from models.models import Request, Content, utc_isoformat
 from extensions import db
-from services.content_generator import generate_educational_content
+from services.content_generator import generate_educational_content, stream_educational_content
+from services.ai_service import generate_exercise, generate_summary, retry_policy
+from services.resilience import CircuitOpenError
+from services.schemas import structured_output_stats
+from services.qcm_parser import parse_qcm
+from services.structured_content import build_structured_data, get_structured_data
+from services.content_history import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, get_history
+from services.serializers import SHALLOW, VIEWS, list_requests
+from services.user_stats import get_user_stats, record_generations
+from services.database import read_only
+from services.logging_setup import log_payload
+from services.generation_cache import generation_cache
+from services.singleflight import generation_flight
+from services.job_queue import batch_queue, generation_queue
+from services.prompts import prompts
+from services.exports import FORMATS as EXPORT_FORMATS, MIMETYPES, ExportNotFound, ExportQueueFull, exports
+from datetime import datetime
 import json
+import logging
 import os
+import uuid
 
 content_bp = Blueprint('content', __name__, url_prefix='/api/content')
 
+logger = logging.getLogger(__name__)
+
 # Variable globale pour le mode développement
 IS_DEVELOPMENT = True  # À mettre à False en production
 
+# Génération par lot
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+
+# Generator and title prefix of each content type
+CONTENT_GENERATORS = {
+    'qcm': generate_educational_content,
+    'exercise': generate_exercise,
+    'summary': generate_summary
+}
+CONTENT_TITLES = {
+    'qcm': 'QCM',
+    'exercise': 'Exercise',
+    'summary': 'Summary'
+}
+
+def add_cors_headers(response):
+    """Add the CORS headers expected by the frontend."""
+    response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+    response.headers['Access-Control-Allow-Credentials'] = 'true'
+    return response
+
+def add_qcm_content(request_obj, content):
+    """Attach the generated QCM to a flushed Request."""
+    # Même horodatage pour le contenu et les statistiques de l'utilisateur
+    generated_at = datetime.utcnow()
+    content_obj = Content(
+        user_id=request_obj.user_id,
+        request_id=request_obj.id,
+        title=f"QCM {request_obj.topic} - {request_obj.level}",
+        content_type='qcm',
+        content_data=content,  # Store the raw text response directly
+        structured_data=structure_qcm(content),
+        prompt_version=generate_educational_content.prompt_version,
+        created_at=generated_at
+    )
+    db.session.add(content_obj)
+    record_generations(request_obj.user_id, ['qcm'], generated_at=generated_at)
+    return content_obj
+
+def save_qcm(user_id, subject, grade, content):
+    """Store the generation as a Request with its QCM Content."""
+    request_obj = Request(
+        user_id=user_id,
+        topic=subject,
+        level=grade
+    )
+    db.session.add(request_obj)
+    db.session.flush()
+    
+    content_obj = add_qcm_content(request_obj, content)
+    db.session.commit()
+    return request_obj, content_obj
+
+def structure_qcm(content):
+    """Parse the generated content into a structured format."""
+    return parse_qcm(content).to_dict()
+
+def run_qcm_job(request_id, use_cache=True):
+    """Generate the QCM of a queued Request (runs in a generation worker)."""
+    request_obj = Request.query.get(request_id)
+    if request_obj is None:
+        logger.warning("Job request %s no longer exists", request_id)
+        return
+    job_id = request_obj.job_id
+    
+    try:
+        request_obj.status = 'running'
+        request_obj.started_at = datetime.utcnow()
+        db.session.commit()
+        
+        content = generate_educational_content(
+            subject=request_obj.topic,
+            grade=request_obj.level,
+            use_cache=use_cache
+        )
+        add_qcm_content(request_obj, content)
+        request_obj.status = 'completed'
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Generation job %s failed", job_id)
+        request_obj.status = 'failed'
+        request_obj.error = str(e)
+    request_obj.finished_at = datetime.utcnow()
+    db.session.commit()
+
+def enqueue_qcm(user_id, subject, grade, use_cache=True):
+    """Record a queued Request and hand the generation to the worker pool."""
+    request_obj = Request(
+        user_id=user_id,
+        topic=subject,
+        level=grade,
+        job_id=str(uuid.uuid4()),
+        status='queued'
+    )
+    db.session.add(request_obj)
+    db.session.commit()
+    
+    if not generation_queue.submit(run_qcm_job, request_obj.id, use_cache=use_cache):
+        request_obj.status = 'failed'
+        request_obj.error = 'Generation queue is full'
+        request_obj.finished_at = datetime.utcnow()
+        db.session.commit()
+        return add_cors_headers(jsonify({'error': 'Generation queue is full, try again later'})), 503
+    
+    response = jsonify({
+        'message': 'Generation job queued',
+        'job_id': request_obj.job_id,
+        'status': request_obj.status,
+        'request_id': request_obj.id,
+        'status_url': f"/api/content/jobs/{request_obj.job_id}"
+    })
+    return add_cors_headers(response), 202
+
+def sse_event(event, data):
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def wants_stream(data):
+    """Whether the client asked for the Server-Sent Events mode."""
+    if data.get('stream') is True:
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+def stream_qcm(user_id, subject, grade, use_cache=True):
+    """Forward the generation as Server-Sent Events and store it at the end."""
+    def events():
+        try:
+            for kind, payload in stream_educational_content(subject=subject, grade=grade, use_cache=use_cache):
+                if kind == 'token':
+                    yield sse_event('token', {'text': payload})
+                elif kind == 'section':
+                    yield sse_event('section', payload)
+                elif kind == 'complete':
+                    request_obj, content_obj = save_qcm(user_id, subject, grade, payload)
+                    yield sse_event('done', {
+                        'message': 'QCM generated successfully',
+                        'content': content_obj.structured_data,
+                        'request_id': request_obj.id,
+                        'content_id': content_obj.id
+                    })
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error streaming content")
+            yield sse_event('error', {'error': str(e)})
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return add_cors_headers(response)
+
 @content_bp.route('/generate', methods=['GET', 'POST', 'OPTIONS'])
 def generate_content():
     """Generate a QCM exercise."""
-    print("\n=== /api/content/generate called ===")
-    print("Request method:", request.method)
-    print("Request headers:", dict(request.headers))
-    
     # Gérer les requêtes OPTIONS pour CORS
     if request.method == 'OPTIONS':
-        response = jsonify({'status': 'ok'})
-        response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        response.headers['Access-Control-Allow-Credentials'] = 'true'
-        return response
+        return add_cors_headers(jsonify({'status': 'ok'}))
         
     # Gérer les requêtes GET
     if request.method == 'GET':
@@ -37,29 +200,26 @@ def generate_content():
         
         # Récupérer les données
         if not request.is_json:
-            print("Request is not JSON")
+            logger.info("Rejected generate request: body is not JSON")
             return jsonify({'error': 'Content-Type must be application/json'}), 400
             
         data = request.get_json()
-        print("Received data:", data)
+        log_payload(logger, "Generate request body", data)
         
         if not data:
-            print("No data provided")
+            logger.info("Rejected generate request: no data provided")
             return jsonify({'error': 'No data provided'}), 400
             
         # Extraire les champs
         subject = data.get('subject')
         grade = data.get('grade')
         
-        print(f"Subject: {subject}, Type: {type(subject)}")
-        print(f"Grade: {grade}, Type: {type(grade)}")
-        
         # Vérifier que les champs existent et ne sont pas vides
         if not subject or not isinstance(subject, str):
-            print(f"Invalid subject: {subject}")
+            logger.info("Rejected generate request: invalid subject %r", subject)
             return jsonify({'error': 'Subject must be a non-empty string'}), 422
         if not grade or not isinstance(grade, str):
-            print(f"Invalid grade: {grade}")
+            logger.info("Rejected generate request: invalid grade %r", grade)
             return jsonify({'error': 'Grade must be a non-empty string'}), 422
             
         # Nettoyer les chaînes
@@ -67,64 +227,32 @@ def generate_content():
         grade = grade.strip()
         
         if not subject or not grade:
-            print("Empty strings after stripping")
+            logger.info("Rejected generate request: empty subject or grade")
             return jsonify({'error': 'Subject and grade cannot be empty'}), 422
             
+        # "fresh": true force une nouvelle génération au lieu du cache
+        use_cache = not data.get('fresh', False)
+            
+        # Mode streaming (Server-Sent Events)
+        if wants_stream(data):
+            return stream_qcm(user_id, subject, grade, use_cache=use_cache)
+            
+        # Mode asynchrone : renvoyer un job id immédiatement
+        if data.get('async') is True:
+            return enqueue_qcm(user_id, subject, grade, use_cache=use_cache)
+            
         # Générer le contenu
         try:
-            print("Generating content with:", {"subject": subject, "grade": grade})
+            logger.info("Generating QCM", extra={'subject': subject, 'grade': grade})
             content = generate_educational_content(
                 subject=subject,
-                grade=grade
-            )
-            print("Generated content:", content)
-            
-            # Créer une nouvelle requête
-            request_obj = Request(
-                user_id=user_id,
-                topic=subject,
-                level=grade
+                grade=grade,
+                use_cache=use_cache
             )
-            db.session.add(request_obj)
-            db.session.flush()
+            log_payload(logger, "Generated content", content)
             
-            # Créer le contenu
-            content_obj = Content(
-                user_id=user_id,
-                request_id=request_obj.id,
-                title=f"QCM {subject} - {grade}",
-                content_type='qcm',
-                content_data=content  # Store the raw text response directly
-            )
-            db.session.add(content_obj)
-            db.session.commit()
-            
-            # Parse the generated content into a structured format
-            lines = content.strip().split('\n')
-            question = ""
-            options = []
-            correct_answer = ""
-            explanation = ""
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('QUESTION:'):
-                    question = line.replace('QUESTION:', '').strip()
-                elif line.startswith('OPTIONS:'):
-                    continue
-                elif line.startswith('CORRECT_ANSWER:'):
-                    correct_answer = line.replace('CORRECT_ANSWER:', '').strip()
-                elif line.startswith('EXPLANATION:'):
-                    explanation = line.replace('EXPLANATION:', '').strip()
-                elif line and line[0].isdigit() and '. ' in line:
-                    options.append(line.split('. ', 1)[1].strip())
-            
-            structured_content = {
-                'question': question,
-                'options': options,
-                'correct_answer': correct_answer,
-                'explanation': explanation
-            }
+            request_obj, content_obj = save_qcm(user_id, subject, grade, content)
+            structured_content = content_obj.structured_data
             
             response = jsonify({
                 'message': 'QCM generated successfully',
@@ -134,22 +262,371 @@ def generate_content():
             })
             
             # Ajouter les headers CORS à la réponse
-            response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            add_cors_headers(response)
             
             return response, 200
             
+        except CircuitOpenError as e:
+            db.session.rollback()
+            logger.warning("AI service unavailable: %s", e)
+            return jsonify({'error': str(e)}), 503
+            
         except Exception as e:
             db.session.rollback()
-            print(f"Error generating content: {str(e)}")
+            logger.exception("Error generating content")
             return jsonify({'error': str(e)}), 500
             
     except Exception as e:
-        print(f"Error in generate_content: {str(e)}")
+        logger.exception("Error in generate_content")
+        return jsonify({'error': str(e)}), 500
+
+def validate_batch_item(item):
+    """Return (subject, grade, content_type) or raise ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError('Item must be an object')
+    subject = item.get('subject')
+    grade = item.get('grade')
+    content_type = item.get('content_type', 'qcm')
+    if not subject or not isinstance(subject, str) or not subject.strip():
+        raise ValueError('Subject must be a non-empty string')
+    if not grade or not isinstance(grade, str) or not grade.strip():
+        raise ValueError('Grade must be a non-empty string')
+    if content_type not in CONTENT_GENERATORS:
+        raise ValueError(f"content_type must be one of: {', '.join(CONTENT_GENERATORS)}")
+    return subject.strip(), grade.strip(), content_type
+
+@content_bp.route('/generate/batch', methods=['POST', 'OPTIONS'])
+def generate_batch():
+    """Generate many subject/grade/content-type items concurrently."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+        
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({'error': f'A batch accepts at most {BATCH_MAX_ITEMS} items'}), 400
+        use_cache = not data.get('fresh', False)
+        
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index,) + validate_batch_item(item))
+            except ValueError as e:
+                results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+        
+        def generate_item(entry):
+            index, subject, grade, content_type = entry
+            try:
+                generated = CONTENT_GENERATORS[content_type](subject, grade, use_cache=use_cache)
+                return entry, generated, None
+            except Exception as e:
+                return entry, None, str(e)
+        
+        # Le pool est partagé par tous les lots : BATCH_CONCURRENCY limite
+        # les générations de l'ensemble des requêtes, pas de chacune
+        futures = [(entry, batch_queue.submit_future(generate_item, entry)) for entry in valid]
+        generated_items = [
+            future.result() if future is not None else (entry, None, 'Batch queue is full, try again later')
+            for entry, future in futures
+        ]
+        
+        # Persist every successful item in a single transaction
+        saved = []
+        for (index, subject, grade, content_type), generated, error in generated_items:
+            if error is not None:
+                results[index] = {
+                    'index': index, 'status': 'error', 'subject': subject, 'grade': grade,
+                    'content_type': content_type, 'error': error
+                }
+                continue
+            request_obj = Request(user_id=user_id, topic=subject, level=grade)
+            saved.append((index, content_type, generated, request_obj))
+        
+        db.session.add_all([request_obj for _, _, _, request_obj in saved])
+        db.session.flush()
+        contents = []
+        generated_at = datetime.utcnow()
+        for index, content_type, generated, request_obj in saved:
+            content_data = generated if isinstance(generated, str) else json.dumps(generated, ensure_ascii=False)
+            contents.append(Content(
+                user_id=user_id,
+                request_id=request_obj.id,
+                title=f"{CONTENT_TITLES[content_type]} {request_obj.topic} - {request_obj.level}",
+                content_type=content_type,
+                content_data=content_data,
+                structured_data=build_structured_data(content_type, generated),
+                prompt_version=CONTENT_GENERATORS[content_type].prompt_version,
+                created_at=generated_at
+            ))
+        db.session.add_all(contents)
+        record_generations(user_id, [content.content_type for content in contents], generated_at=generated_at)
+        db.session.commit()
+        
+        for (index, content_type, generated, request_obj), content_obj in zip(saved, contents):
+            results[index] = {
+                'index': index,
+                'status': 'success',
+                'subject': request_obj.topic,
+                'grade': request_obj.level,
+                'content_type': content_type,
+                'content': content_obj.structured_data,
+                'request_id': request_obj.id,
+                'content_id': content_obj.id
+            }
+        
+        succeeded = len(saved)
+        return add_cors_headers(jsonify({
+            'message': f'{succeeded} of {len(items)} items generated',
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded,
+            'results': results
+        })), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error in generate_batch")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+def get_job(job_id):
+    """Return the status of an asynchronous generation job and its result."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+        
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        request_obj = Request.query.filter_by(job_id=job_id, user_id=user_id).first()
+        if not request_obj:
+            return jsonify({'error': 'Job not found'}), 404
+            
+        result = {
+            'job_id': request_obj.job_id,
+            'status': request_obj.status,
+            'request_id': request_obj.id,
+            'created_at': utc_isoformat(request_obj.date_created),
+            'started_at': utc_isoformat(request_obj.started_at),
+            'finished_at': utc_isoformat(request_obj.finished_at),
+            'error': request_obj.error
+        }
+        if request_obj.status == 'completed' and request_obj.contents:
+            content_obj = request_obj.contents[0]
+            result['content_id'] = content_obj.id
+            result['content'] = get_structured_data(content_obj)
+            
+        return add_cors_headers(jsonify(result)), 200
+        
+    except Exception as e:
+        logger.exception("Error in get_job")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/history', methods=['GET', 'OPTIONS'])
+@read_only
+def content_history():
+    """Paginated history of the user's generations, newest first.
+    
+    Query parameters: limit, cursor (next_cursor of the previous page),
+    content_type, topic, level and fields=summary to leave out the content.
+    """
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+        
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+            
+        page = get_history(
+            user_id,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            content_type=request.args.get('content_type'),
+            topic=request.args.get('topic'),
+            level=request.args.get('level'),
+            summary=request.args.get('fields') == 'summary'
+        )
+        return add_cors_headers(jsonify(page)), 200
+        
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in content_history")
         return jsonify({'error': str(e)}), 500
 
+@content_bp.route('/requests', methods=['GET', 'OPTIONS'])
+@read_only
+def get_requests():
+    """List the user's requests, newest first.
+    
+    Query parameters: view (shallow, or deep to include the contents),
+    limit and before_id (id of the last request of the previous page).
+    """
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+        
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        view = request.args.get('view', SHALLOW)
+        if view not in VIEWS:
+            return jsonify({'error': f"view must be one of {', '.join(VIEWS)}"}), 400
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+            before_id = request.args.get('before_id', type=int)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+            
+        requests_data = list_requests(user_id, view=view, limit=limit, before_id=before_id)
+        return add_cors_headers(jsonify({'requests': requests_data})), 200
+        
+    except Exception as e:
+        logger.exception("Error in get_requests")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/stats', methods=['GET', 'OPTIONS'])
+@read_only
+def content_stats():
+    """Dashboard statistics: total generations, per type, last generation and credits."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+        
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        return add_cors_headers(jsonify(get_user_stats(user_id))), 200
+    except Exception as e:
+        logger.exception("Error in content_stats")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/<int:content_id>', methods=['GET', 'OPTIONS'])
+@read_only
+def get_content(content_id):
+    """Return a stored content with its structured data."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+        
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        content_obj = Content.query.filter_by(id=content_id, user_id=user_id).first()
+        if not content_obj:
+            return jsonify({'error': 'Content not found'}), 404
+            
+        result = content_obj.to_dict()
+        result['structured_data'] = get_structured_data(content_obj)
+        return add_cors_headers(jsonify(result)), 200
+        
+    except Exception as e:
+        logger.exception("Error in get_content")
+        return jsonify({'error': str(e)}), 500
+
+def start_export(scope, target_id=None):
+    """Answer an export request: 200 if the file is cached, 202 while it renders."""
+    user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+    fmt = request.args.get('format', 'pdf')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        export = exports.request_export(int(user_id), scope, target_id, fmt)
+    except ExportNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except ExportQueueFull as e:
+        return add_cors_headers(jsonify({'error': str(e)})), 503
+    return add_cors_headers(jsonify(export_response(export))), 200 if export['status'] == 'ready' else 202
+
+def export_response(export):
+    """Export status with the URLs the client polls and downloads from."""
+    result = dict(export)
+    result['status_url'] = f"/api/content/exports/{export['export_id']}"
+    if export['status'] == 'ready':
+        result['download_url'] = f"/api/content/exports/{export['export_id']}/download"
+    return result
+
+@content_bp.route('/<int:content_id>/export', methods=['POST', 'OPTIONS'])
+def export_content(content_id):
+    """Export one content as PDF or DOCX (?format=pdf|docx)."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+    try:
+        return start_export('content', content_id)
+    except Exception as e:
+        logger.exception("Error in export_content")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/requests/<int:request_id>/export', methods=['POST', 'OPTIONS'])
+def export_request(request_id):
+    """Export every content of a request as PDF or DOCX (?format=pdf|docx)."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+    try:
+        return start_export('request', request_id)
+    except Exception as e:
+        logger.exception("Error in export_request")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/history/export', methods=['POST', 'OPTIONS'])
+def export_history():
+    """Export the user's whole history as PDF or DOCX (?format=pdf|docx)."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+    try:
+        return start_export('history')
+    except Exception as e:
+        logger.exception("Error in export_history")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/exports/<export_id>', methods=['GET', 'OPTIONS'])
+def get_export(export_id):
+    """Status of an export: queued, running, ready or failed."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        export = exports.status(int(user_id), export_id) if exports.is_export_id(export_id) else None
+        if export is None:
+            return jsonify({'error': 'Export not found'}), 404
+        return add_cors_headers(jsonify(export_response(export))), 200
+    except Exception as e:
+        logger.exception("Error in get_export")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/exports/<export_id>/download', methods=['GET', 'OPTIONS'])
+def download_export(export_id):
+    """Send a rendered export straight from the disk cache."""
+    if request.method == 'OPTIONS':
+        return add_cors_headers(jsonify({'status': 'ok'}))
+    try:
+        user_id = 1 if IS_DEVELOPMENT else get_jwt_identity()
+        found = exports.find(int(user_id), export_id) if exports.is_export_id(export_id) else None
+        if found is None:
+            return jsonify({'error': 'Export not found or not ready'}), 404
+        path, fmt = found
+        # Le nom du fichier dépend de son contenu : il peut être mis en cache par le navigateur
+        response = send_file(path, mimetype=MIMETYPES[fmt], as_attachment=True,
+                             download_name=exports.download_name(export_id, fmt), max_age=3600)
+        return add_cors_headers(response)
+    except Exception as e:
+        logger.exception("Error in download_export")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/generation-stats', methods=['GET'])
+def generation_stats():
+    """Return generation cache, request coalescing and job queue counters, and the prompt templates."""
+    return jsonify({
+        'cache': generation_cache.stats(),
+        'coalescing': generation_flight.stats(),
+        'jobs': generation_queue.stats(),
+        'batch': batch_queue.stats(),
+        'exports': exports.queue.stats(),
+        'prompts': prompts.describe(),
+        'retries': retry_policy.stats(),
+        'structured_output': structured_output_stats.stats()
+    }), 200
+
 @content_bp.route('/test-ai', methods=['GET'])
 def test_ai():
     """Test endpoint to check AI service connection."""
@@ -158,5 +635,5 @@ def test_ai():
         result = test_ollama_connection()
         return jsonify(result), 200 if result['status'] == 'success' else 500
     except Exception as e:
-        print(f"Error testing AI service: {str(e)}")
+        logger.exception("Error testing AI service")
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -1,24 +1,24 @@
+import logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from services.content_generator import generate_educational_content
-import json
 from models.models import User
 from extensions import db
+from services.serializers import SHALLOW, VIEWS, list_users as serialize_users
+from services.database import read_only
+from services.logging_setup import log_payload
 
 test_bp = Blueprint('test', __name__, url_prefix='/api/test')
 
+logger = logging.getLogger(__name__)
+
 @test_bp.route('/generate', methods=['POST'])
 # @jwt_required()  # Désactivé temporairement
 def test_generate():
     try:
-        print("\n=== Headers reçus ===")
-        print(dict(request.headers))
-        
         # Récupérer les données brutes
         data = request.get_json(force=True, silent=True)
-        print("\n=== Données reçues (test_generate) ===")
-        print(data)
-        print(f"Type des données: {type(data)}")
+        log_payload(logger, "Test generate request body", data)
         
         # Vérifier que les données sont présentes
         if not data:
@@ -30,12 +30,6 @@ def test_generate():
         topic = str(data.get('topic', ''))
         learning_objectives = str(data.get('learningObjectives', ''))
         
-        print("\n=== Champs extraits (test_generate) ===")
-        print(f"subject: {subject} (type: {type(subject)})")
-        print(f"grade: {grade} (type: {type(grade)})")
-        print(f"topic: {topic} (type: {type(topic)})")
-        print(f"learning_objectives: {learning_objectives} (type: {type(learning_objectives)})")
-        
         # Vérifier que les champs ne sont pas vides
         if not all([subject, grade, topic, learning_objectives]):
             missing_fields = []
@@ -50,17 +44,17 @@ def test_generate():
             
         # Générer le contenu
         try:
-            print(f'AVANT GENERATE (test_generate): subject={subject!r} type={type(subject)}')
+            logger.info("Test generation", extra={'subject': subject, 'grade': grade, 'topic': topic})
             content = generate_educational_content(
                 subject=subject,
                 grade=grade,
                 topic=topic,
                 learning_objectives=learning_objectives
             )
-            print("Contenu généré avec succès:", json.dumps(content, indent=2))
+            log_payload(logger, "Test generated content", content)
             return jsonify(content), 200
         except Exception as e:
-            print(f"Erreur lors de la génération (test_generate): {str(e)}")
+            logger.exception("Error during test generation")
             return jsonify({
                 'error': str(e),
                 'details': {
@@ -72,19 +66,22 @@ def test_generate():
             }), 500
             
     except Exception as e:
-        print(f"Erreur dans la route (test_generate): {str(e)}")
+        logger.exception("Error in test_generate")
         return jsonify({
             'error': str(e),
             'type': type(e).__name__
         }), 500
 
 @test_bp.route('/users', methods=['GET'])
+@read_only
 def list_users():
-    """List all users (development only)"""
+    """List all users (development only), with ?view=deep for their requests and contents"""
     try:
-        users = User.query.all()
+        view = request.args.get('view', SHALLOW)
+        if view not in VIEWS:
+            return jsonify({'error': f"view must be one of {', '.join(VIEWS)}"}), 400
         return jsonify({
-            'users': [user.to_dict() for user in users]
+            'users': serialize_users(view)
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -102,12 +99,11 @@ def create_test_user():
             }), 200
 
         # Créer un nouvel utilisateur de test
-        from werkzeug.security import generate_password_hash
         test_user = User(
             username='testuser',
-            email='test@example.com',
-            password_hash=generate_password_hash('password123')
+            email='test@example.com'
         )
+        test_user.set_password('password123')
         db.session.add(test_user)
         db.session.commit()
 
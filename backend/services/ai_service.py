@@ -1,27 +1,61 @@
 import os
+import time
 import requests
-from typing import Dict, Any
-import json
+from typing import Dict, Any, Iterator, Optional
 import logging
 from flask import current_app
+from extensions import ollama, ollama_pool
+from services.generation_cache import cached_generation
+from services.resilience import (
+    CircuitOpenError, LLMServiceError, RetryPolicy, RetryableLLMError, is_retryable
+)
+from services.schemas import SCHEMAS, parse_structured
+from services.logging_setup import log_payload
+from services.metrics import LLM_FAILURES, LLM_RETRIES, LLMCallTimer, record_ollama_timings
+from services.prompts import EXERCISE_PROMPT, QUIZ_PROMPT, SUMMARY_PROMPT
+
+logger = logging.getLogger(__name__)
 
-OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'mistral:latest')
-OLLAMA_API_URL = f"{OLLAMA_BASE_URL}/api/generate"
-MODEL_NAME = "mistral:latest"
-MODEL = "mistral:latest"
+
+# Retries of the LLM call: exponential backoff with jitter, bounded by a budget
+retry_policy = RetryPolicy(
+    max_attempts=int(os.getenv('OLLAMA_MAX_ATTEMPTS', '3')),
+    base_delay=float(os.getenv('OLLAMA_RETRY_BASE_DELAY', '0.5')),
+    max_delay=float(os.getenv('OLLAMA_RETRY_MAX_DELAY', '8')),
+    budget_ratio=float(os.getenv('OLLAMA_RETRY_BUDGET_RATIO', '0.2'))
+)
+
+# Structured output for JSON generators: 'schema' passes the JSON schema as
+# Ollama's format (Ollama >= 0.5), 'json' only forces JSON, 'off' disables it
+STRUCTURED_OUTPUT_MODE = os.getenv('OLLAMA_STRUCTURED_OUTPUT', 'schema').lower()
+
+def structured_format(kind: str):
+    """Value of Ollama's ``format`` parameter for a content type."""
+    if STRUCTURED_OUTPUT_MODE == 'schema':
+        return SCHEMAS[kind]
+    if STRUCTURED_OUTPUT_MODE == 'json':
+        return 'json'
+    return None
+
+def parse_generated(kind: str, response: str) -> Dict[str, Any]:
+    """Parse and validate a JSON generation against the schema of its type."""
+    return parse_structured(kind, response, lenient=STRUCTURED_OUTPUT_MODE == 'off')
+
+def resolve_model() -> str:
+    """Return the model to use, preferring OLLAMA_MODEL when a healthy host has it."""
+    try:
+        return ollama_pool.resolve_model(OLLAMA_MODEL)
+    except requests.exceptions.RequestException as e:
+        raise RetryableLLMError(f"Failed to connect to Ollama. Is it running? Error: {str(e)}")
 
 def test_ollama_connection() -> Dict[str, Any]:
     """Test the connection to Ollama and return available models."""
     try:
         # Test basic connection
-        print("Testing connection to Ollama...")
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
-        response.raise_for_status()
-        
-        # Get available models
-        models = response.json().get('models', [])
-        print(f"Available models: {models}")
+        logger.info("Testing connection to Ollama")
+        models = ollama_pool.get_models()
+        logger.debug("Available models: %s", [m.get('name') for m in models])
         
         if not models:
             return {
@@ -31,29 +65,26 @@ def test_ollama_connection() -> Dict[str, Any]:
             }
         
         # Test model generation with a simple prompt
-        print("Testing model generation...")
         test_prompt = "Say 'Hello, this is a test'"
         
         # Get the model name from the first available model
         model_name = models[0].get('name', 'mistral:latest')
-        print(f"Using model: {model_name}")
+        logger.info("Testing generation with model %s", model_name)
         
         test_request = {
             "model": model_name,
             "prompt": test_prompt,
             "stream": False
         }
-        print(f"Sending test request: {test_request}")
         
-        test_response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json=test_request,
-            timeout=10
-        )
+        with ollama_pool.acquire(model_name) as backend:
+            test_response = ollama.post(
+                'generate', test_request, timeout=(ollama.connect_timeout, 10), base_url=backend.url
+            )
         
         if test_response.status_code != 200:
-            print(f"Error response from Ollama: {test_response.status_code}")
-            print(f"Response content: {test_response.text}")
+            logger.error("Ollama test generation returned %s", test_response.status_code,
+                         extra={'response_body': test_response.text[:500]})
             return {
                 'status': 'error',
                 'message': f'Ollama returned error {test_response.status_code}: {test_response.text}',
@@ -61,301 +92,228 @@ def test_ollama_connection() -> Dict[str, Any]:
             }
             
         result = test_response.json()
-        print(f"Test response: {result}")
+        log_payload(logger, "Ollama test response", result)
         
         return {
             'status': 'success',
             'message': 'Ollama is working correctly',
             'models': models,
+            'backends': ollama_pool.stats(),
             'test_response': result.get('response', '')
         }
         
     except requests.exceptions.ConnectionError:
-        print("Failed to connect to Ollama. Is it running?")
+        logger.error("Failed to connect to Ollama. Is it running?")
         return {
             'status': 'error',
             'message': 'Failed to connect to Ollama. Is it running?',
             'models': []
         }
     except Exception as e:
-        print(f"Error testing Ollama: {str(e)}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"Response content: {e.response.text}")
+        logger.exception("Error testing Ollama")
         return {
             'status': 'error',
             'message': f'Error testing Ollama: {str(e)}',
             'models': []
         }
 
-def get_llm_response(prompt: str, max_retries: int = 3) -> str:
-    """Get a response from the LLM model via Ollama."""
-    for attempt in range(max_retries):
+def get_llm_response(prompt: str, max_retries: Optional[int] = None, response_format: Any = None,
+                     options: Optional[Dict[str, Any]] = None) -> str:
+    """Get a response from the LLM model via Ollama.
+
+    Only transient failures (transport errors, timeouts, 5xx/429, empty
+    answers) are retried, with exponential backoff and jitter and within
+    the shared retry budget. When every backend's circuit is open the call
+    fails immediately with CircuitOpenError. ``response_format`` is passed
+    as Ollama's ``format`` ('json' or a JSON schema) to constrain the output
+    and ``options`` (num_predict, num_ctx, temperature...) as its ``options``.
+    """
+    fields = {'format': response_format} if response_format else {}
+    if options:
+        fields['options'] = options
+    max_attempts = max_retries or retry_policy.max_attempts
+    retry_policy.record_call()
+    model_to_use = OLLAMA_MODEL
+    for attempt in range(max_attempts):
         try:
-            # First, check if Ollama is running and get available models
-            try:
-                models_response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=10)
-                models_response.raise_for_status()
-                available_models = models_response.json().get('models', [])
-                
-                if not available_models:
-                    raise Exception("No models available. Please install a model first.")
-                    
-                # Use the first available model if our preferred model isn't available
-                model_to_use = OLLAMA_MODEL
-                if OLLAMA_MODEL not in [m.get('name', '') for m in available_models]:
-                    model_to_use = available_models[0].get('name', 'mistral:latest')
-                    print(f"Warning: {OLLAMA_MODEL} not found, using {model_to_use} instead")
-            except requests.exceptions.RequestException as e:
-                raise Exception(f"Failed to connect to Ollama. Is it running? Error: {str(e)}")
+            # Pick the model from the shared registry (cached /api/tags)
+            model_to_use = resolve_model()
             
             # Make the actual request
-            print(f"Sending request to Ollama with model: {model_to_use}")
-            print(f"Prompt: {prompt}")
+            log_payload(logger, "LLM prompt", prompt, model=model_to_use)
             
-            # Simplified request format with increased timeout
-            response = requests.post(
-                f"{OLLAMA_BASE_URL}/api/generate",
-                json={
-                    "model": model_to_use,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=120  # Increase timeout to 120 seconds
-            )
-            response.raise_for_status()
-            result = response.json()
-            print(f"Ollama response: {result}")
+            # Least-loaded healthy host that has the model
+            with ollama_pool.acquire(model_to_use) as backend:
+                logger.debug("Sending request to Ollama", extra={'model': model_to_use, 'backend': backend.url})
+                with LLMCallTimer(model_to_use):
+                    result = ollama.generate(model_to_use, prompt, base_url=backend.url, **fields)
+            log_payload(logger, "Ollama response", result, model=model_to_use)
+            record_ollama_timings(model_to_use, result)
             
             if 'response' not in result:
-                raise Exception("No response field in Ollama response")
+                raise LLMServiceError("No response field in Ollama response")
                 
             # Clean up the response text
             response_text = result['response'].strip()
             if not response_text:
-                raise Exception("Empty response from Ollama")
+                raise RetryableLLMError("Empty response from Ollama")
                 
             return response_text
             
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                print(f"Timeout occurred, retrying... (attempt {attempt + 1}/{max_retries})")
-                continue
-            raise Exception("Request timed out after multiple retries")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Error getting LLM response: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response content: {e.response.text}")
-            if attempt < max_retries - 1:
-                print(f"Retrying... (attempt {attempt + 1}/{max_retries})")
-                continue
-            raise Exception(f"Failed to get response from AI model: {str(e)}")
+        except CircuitOpenError as e:
+            LLM_FAILURES.inc(model=model_to_use, error=type(e).__name__)
+            raise
             
         except Exception as e:
-            print(f"Unexpected error: {e}")
-            import traceback
-            print("Traceback:", traceback.format_exc())
-            if attempt < max_retries - 1:
-                print(f"Retrying... (attempt {attempt + 1}/{max_retries})")
-                continue
+            logger.warning("Error getting LLM response (attempt %d/%d): %s", attempt + 1, max_attempts, e)
+            if hasattr(e, 'response') and e.response is not None:
+                log_payload(logger, "Ollama error response", e.response.text)
+                if e.response.status_code == 404:
+                    # The model was removed since the list was cached
+                    ollama_pool.invalidate_models()
+                    
+            if not is_retryable(e):
+                LLM_FAILURES.inc(model=model_to_use, error=type(e).__name__)
+                if isinstance(e, requests.exceptions.RequestException):
+                    raise LLMServiceError(f"Failed to get response from AI model: {str(e)}")
+                raise
+            if attempt < max_attempts - 1:
+                allowed = retry_policy.try_acquire_retry()
+                LLM_RETRIES.inc(model=model_to_use, allowed=str(allowed).lower())
+                if allowed:
+                    delay = retry_policy.backoff(attempt)
+                    logger.info("Retrying LLM call in %.2fs (attempt %d/%d)", delay, attempt + 1, max_attempts)
+                    time.sleep(delay)
+                    continue
+            LLM_FAILURES.inc(model=model_to_use, error=type(e).__name__)
+            if isinstance(e, requests.exceptions.Timeout):
+                raise RetryableLLMError("Request timed out after multiple retries")
+            if isinstance(e, requests.exceptions.RequestException):
+                raise RetryableLLMError(f"Failed to get response from AI model: {str(e)}")
             raise
 
+def stream_llm_response(prompt: str, options: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Stream the LLM response token by token via Ollama's NDJSON API.
+
+    Unlike get_llm_response there is no retry loop: once tokens have been
+    forwarded to the client the generation cannot be restarted transparently.
+    """
+    fields = {'options': options} if options else {}
+    model_to_use = resolve_model()
+    log_payload(logger, "LLM prompt (streaming)", prompt, model=model_to_use)
+
+    received = False
+    try:
+        with ollama_pool.acquire(model_to_use) as backend, LLMCallTimer(model_to_use):
+            for chunk in ollama.generate_stream(model_to_use, prompt, base_url=backend.url, **fields):
+                token = chunk.get('response', '')
+                if token:
+                    received = True
+                    yield token
+                if chunk.get('done'):
+                    record_ollama_timings(model_to_use, chunk)
+    except requests.exceptions.RequestException as e:
+        LLM_FAILURES.inc(model=model_to_use, error=type(e).__name__)
+        logger.warning("Error streaming LLM response: %s", e)
+        if hasattr(e, 'response') and e.response is not None and e.response.status_code == 404:
+            # The model was removed since the list was cached
+            ollama_pool.invalidate_models()
+        raise LLMServiceError(f"Failed to get response from AI model: {str(e)}")
+
+    if not received:
+        raise RetryableLLMError("Empty response from Ollama")
+
+@cached_generation('quiz', QUIZ_PROMPT.version_id, OLLAMA_MODEL)
 def generate_qcm(topic: str, level: str) -> Dict[str, Any]:
     """Generate a QCM (multiple choice quiz) on a given topic."""
-    print(f"Generating QCM for topic: {topic}, level: {level}")
+    logger.info("Generating quiz", extra={'topic': topic, 'level': level})
     
     if not isinstance(topic, str):
-        print(f"Topic is not a string, it's a {type(topic)}")
         raise ValueError("Topic must be a string")
         
     if not topic or not topic.strip():
-        print("Topic is empty or only whitespace")
         raise ValueError("Topic cannot be empty")
         
-    prompt = f"""You are an educational content generator. Generate a 5-question multiple choice quiz about "{topic.strip()}" for {level} level.
-    Return ONLY a valid JSON object in this exact format, with no additional text:
-    {{
-        "questions": [
-            {{
-                "question": "Question text",
-                "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
-                "correct_answer": 0,
-                "explanation": "Explanation of the correct answer"
-            }}
-        ]
-    }}
-
-    Important:
-    - Each question MUST have exactly 4 options
-    - The correct_answer must be an index (0-3) corresponding to the correct option
-    - Do not include any text before or after the JSON object
-    - Make sure the JSON is properly formatted with double quotes
-    """
+    prompt = QUIZ_PROMPT.render(topic=topic, level=level)
     
     try:
-        print("Sending prompt to Ollama:", prompt)
-        response = get_llm_response(prompt)
-        print("Raw response from Ollama:", response)
+        response = get_llm_response(prompt, response_format=structured_format('quiz'), options=QUIZ_PROMPT.options)
+        log_payload(logger, "Raw quiz response", response)
         
-        # Try to parse the response as JSON
-        try:
-            result = json.loads(response)
-            print("Parsed JSON result:", result)
-            
-            # Validate the response format
-            if 'questions' not in result:
-                raise ValueError("Response missing 'questions' field")
-                
-            for i, question in enumerate(result['questions']):
-                if 'options' not in question:
-                    raise ValueError(f"Question {i+1} missing 'options' field")
-                if len(question['options']) != 4:
-                    raise ValueError(f"Question {i+1} must have exactly 4 options")
-                if 'correct_answer' not in question:
-                    raise ValueError(f"Question {i+1} missing 'correct_answer' field")
-                if not isinstance(question['correct_answer'], int) or question['correct_answer'] not in range(4):
-                    raise ValueError(f"Question {i+1} correct_answer must be an integer between 0 and 3")
-                if 'explanation' not in question:
-                    raise ValueError(f"Question {i+1} missing 'explanation' field")
-            
-            return result
-            
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse response as JSON: {e}")
-            print("Raw response that failed to parse:", response)
-            # Try to extract JSON from the response if it's wrapped in other text
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group())
-                    print("Successfully extracted and parsed JSON:", result)
-                    return result
-                except json.JSONDecodeError:
-                    pass
-            raise Exception("Failed to parse QCM response as JSON")
+        # Parse and validate against the quiz schema
+        return parse_generated('quiz', response)
     except Exception as e:
-        print(f"Failed to generate QCM: {str(e)}")
+        logger.warning("Failed to generate QCM: %s", e)
         raise
 
+@cached_generation('exercise', EXERCISE_PROMPT.version_id, OLLAMA_MODEL)
 def generate_exercise(topic: str, level: str) -> Dict[str, Any]:
     """Generate a practical exercise on a given topic."""
-    print(f"Generating exercise for topic: {topic}, level: {level}")
+    logger.info("Generating exercise", extra={'topic': topic, 'level': level})
     
     if not isinstance(topic, str):
-        print(f"Topic is not a string, it's a {type(topic)}")
         raise ValueError("Topic must be a string")
         
     if not topic or not topic.strip():
-        print("Topic is empty or only whitespace")
         raise ValueError("Topic cannot be empty")
         
-    prompt = f"""You are an educational content generator. Generate a practical exercise about "{topic.strip()}" for {level} level.
-    Return ONLY a valid JSON object in this exact format, with no additional text:
-    {{
-        "title": "Exercise title",
-        "description": "Exercise description",
-        "steps": ["Step 1", "Step 2", ...],
-        "solution": "Detailed solution",
-        "hints": ["Hint 1", "Hint 2", ...]
-    }}"""
+    prompt = EXERCISE_PROMPT.render(topic=topic, level=level)
     
     try:
-        response = get_llm_response(prompt)
-        result = json.loads(response)
-        print(f"Generated exercise: {result}")
+        response = get_llm_response(prompt, response_format=structured_format('exercise'), options=EXERCISE_PROMPT.options)
+        result = parse_generated('exercise', response)
+        log_payload(logger, "Generated exercise", result)
         return result
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse exercise response as JSON: {e}")
-        print(f"Raw response: {response}")
-        raise Exception("Failed to parse exercise response as JSON")
     except Exception as e:
-        print(f"Failed to generate exercise: {str(e)}")
+        logger.warning("Failed to generate exercise: %s", e)
         raise
 
+@cached_generation('summary', SUMMARY_PROMPT.version_id, OLLAMA_MODEL)
 def generate_summary(topic: str, level: str) -> Dict[str, Any]:
     """Generate a summary sheet on a given topic."""
-    print(f"Generating summary for topic: {topic}, level: {level}")
+    logger.info("Generating summary", extra={'topic': topic, 'level': level})
     
     if not isinstance(topic, str):
-        print(f"Topic is not a string, it's a {type(topic)}")
         raise ValueError("Topic must be a string")
         
     if not topic or not topic.strip():
-        print("Topic is empty or only whitespace")
         raise ValueError("Topic cannot be empty")
         
-    prompt = f"""You are an educational content generator. Generate a summary sheet about "{topic.strip()}" for {level} level.
-    Return ONLY a valid JSON object in this exact format, with no additional text:
-    {{
-        "title": "Summary title",
-        "key_points": ["Point 1", "Point 2", ...],
-        "main_concepts": ["Concept 1", "Concept 2", ...],
-        "examples": ["Example 1", "Example 2", ...],
-        "conclusion": "Conclusion text"
-    }}"""
+    prompt = SUMMARY_PROMPT.render(topic=topic, level=level)
     
     try:
-        response = get_llm_response(prompt)
-        result = json.loads(response)
-        print(f"Generated summary: {result}")
+        response = get_llm_response(prompt, response_format=structured_format('summary'), options=SUMMARY_PROMPT.options)
+        result = parse_generated('summary', response)
+        log_payload(logger, "Generated summary", result)
         return result
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse summary response as JSON: {e}")
-        print(f"Raw response: {response}")
-        raise Exception("Failed to parse summary response as JSON")
     except Exception as e:
-        print(f"Failed to generate summary: {str(e)}")
+        logger.warning("Failed to generate summary: %s", e)
         raise
 
 def generate_content(prompt: str) -> str:
     """Get a response from the LLM model via Ollama."""
     try:
-        # First, check if Ollama is running and get available models
-        try:
-            models_response = requests.get(f"{OLLAMA_BASE_URL}/api/tags")
-            models_response.raise_for_status()
-            available_models = models_response.json().get('models', [])
-            
-            if not available_models:
-                raise Exception("No models available. Please install a model first.")
-                
-            # Use the first available model if our preferred model isn't available
-            model_to_use = OLLAMA_MODEL
-            if OLLAMA_MODEL not in [m.get('name', '') for m in available_models]:
-                model_to_use = available_models[0].get('name', 'mistral:latest')
-                print(f"Warning: {OLLAMA_MODEL} not found, using {model_to_use} instead")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to connect to Ollama. Is it running? Error: {str(e)}")
+        # Pick the model from the shared registry (cached /api/tags)
+        model_to_use = resolve_model()
         
         # Make the actual request
-        print(f"Sending request to Ollama with model: {model_to_use}")
-        print(f"Prompt: {prompt}")
+        log_payload(logger, "LLM prompt", prompt, model=model_to_use)
         
-        # Simplified request format
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json={
-                "model": model_to_use,
-                "prompt": prompt,
-                "stream": False
-            }
-        )
-        response.raise_for_status()
-        result = response.json()
-        print(f"Ollama response: {result}")
+        with ollama_pool.acquire(model_to_use) as backend:
+            result = ollama.generate(model_to_use, prompt, base_url=backend.url)
+        log_payload(logger, "Ollama response", result, model=model_to_use)
         
         if 'response' not in result:
             raise Exception("No response field in Ollama response")
             
         return result['response']
     except requests.exceptions.RequestException as e:
-        print(f"Error getting LLM response: {e}")
+        logger.warning("Error getting LLM response: %s", e)
         if hasattr(e, 'response') and e.response is not None:
-            print(f"Response content: {e.response.text}")
+            log_payload(logger, "Ollama error response", e.response.text)
+            if e.response.status_code == 404:
+                ollama_pool.invalidate_models()
         raise Exception(f"Failed to get response from AI model: {str(e)}")
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        import traceback
-        print("Traceback:", traceback.format_exc())
+        logger.exception("Unexpected error getting LLM response")
         raise 
\ No newline at end of file
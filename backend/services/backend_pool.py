@@ -0,0 +1,245 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from services.metrics import LLM_IN_FLIGHT
+from services.model_registry import ModelRegistry, select_model
+from services.resilience import CircuitBreaker, CircuitOpenError, LLMServiceError, is_retryable
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaBackend:
+    """One Ollama host: its installed models, health and in-flight load."""
+
+    def __init__(self, url: str, client, models_ttl: float = 60.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.url = url.rstrip('/')
+        self.breaker = breaker or CircuitBreaker()
+        self.client = client
+        # Kept fresh by the pool's periodic probes
+        self.models = ModelRegistry(lambda: client.tags(base_url=self.url), ttl=models_ttl)
+        self.in_flight = 0
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[float] = None
+        self.unhealthy_since: Optional[float] = None
+
+    def probe(self) -> bool:
+        """Check the host with a cheap /api/tags call and refresh its models."""
+        try:
+            models = self.client.tags(base_url=self.url)
+        except Exception as e:
+            self.mark_unhealthy(e)
+        else:
+            self.models.update(models)
+            self.healthy = True
+            self.last_error = None
+            self.unhealthy_since = None
+        self.last_probe = time.time()
+        return self.healthy
+
+    def mark_unhealthy(self, error: Any) -> None:
+        if self.healthy:
+            logger.warning("Ollama backend %s marked unhealthy: %s", self.url, error)
+            self.unhealthy_since = time.monotonic()
+        self.healthy = False
+        self.last_error = str(error)
+
+    def model_names(self) -> List[str]:
+        """Installed model names; an unreachable host is marked unhealthy."""
+        try:
+            return self.models.get_model_names()
+        except Exception as e:
+            self.record_fetch_failure(e)
+            return []
+
+    def record_fetch_failure(self, error: Any) -> None:
+        """A model lookup on the request path failed: count it against the circuit."""
+        self.mark_unhealthy(error)
+        self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        models = self.models._models or []
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'in_flight': self.in_flight,
+            'circuit': self.breaker.stats(),
+            'models': [m.get('name', '') for m in models],
+            'last_error': self.last_error,
+            'last_probe': self.last_probe
+        }
+
+
+class BackendPool:
+    """Route generations across several Ollama hosts.
+
+    Each host is probed every ``probe_interval`` seconds; a generation goes
+    to the healthy host with the fewest in-flight requests among those that
+    have the requested model installed. A host that fails at the transport
+    level is taken out of rotation until a probe succeeds again, and each
+    host has a circuit breaker fed by the outcome of real generations.
+    With probing off (``probe_interval <= 0``) such a host is put back in
+    rotation after ``breaker_reset`` seconds and the next request checks it.
+    """
+
+    def __init__(self, client, urls: Optional[List[str]] = None, probe_interval: float = 15.0,
+                 models_ttl: float = 60.0, breaker_failures: int = 5, breaker_reset: float = 30.0):
+        self.client = client
+        self.probe_interval = probe_interval
+        self.models_ttl = models_ttl
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.backends: List[OllamaBackend] = []
+        self.configure(urls or [client.base_url])
+
+    def init_app(self, app) -> None:
+        urls = app.config.get('OLLAMA_BASE_URLS') or [app.config.get('OLLAMA_BASE_URL', self.client.base_url)]
+        self.probe_interval = float(app.config.get('OLLAMA_PROBE_INTERVAL', self.probe_interval))
+        self.models_ttl = float(app.config.get('OLLAMA_MODELS_TTL', self.models_ttl))
+        self.breaker_failures = int(app.config.get('OLLAMA_BREAKER_FAILURES', self.breaker_failures))
+        self.breaker_reset = float(app.config.get('OLLAMA_BREAKER_RESET', self.breaker_reset))
+        self.configure(urls)
+        app.extensions['ollama_pool'] = self
+
+    def configure(self, urls: List[str]) -> None:
+        with self._lock:
+            self.backends = [
+                OllamaBackend(url, self.client, self.models_ttl,
+                              CircuitBreaker(self.breaker_failures, self.breaker_reset))
+                for url in urls if url
+            ]
+
+    def _ensure_prober(self) -> None:
+        if self.probe_interval <= 0 or self._prober is not None:
+            return
+        with self._lock:
+            if self._prober is not None:
+                return
+            self._prober = threading.Thread(target=self._probe_loop, name='ollama-prober', daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.probe_interval):
+            self.probe_all()
+
+    def probe_all(self) -> None:
+        for backend in list(self.backends):
+            backend.probe()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _retry_unhealthy(self) -> None:
+        """Without probes nothing would clear the flag: let requests retry the host."""
+        cutoff = time.monotonic() - self.breaker_reset
+        for backend in self.backends:
+            if not backend.healthy and backend.unhealthy_since is not None and backend.unhealthy_since <= cutoff:
+                logger.info("Retrying unhealthy Ollama backend %s", backend.url)
+                backend.healthy = True
+                backend.unhealthy_since = None
+
+    def _candidates(self) -> List[OllamaBackend]:
+        self._ensure_prober()
+        if self.probe_interval <= 0:
+            self._retry_unhealthy()
+        available = [b for b in self.backends if b.breaker.state != CircuitBreaker.OPEN]
+        if not available:
+            raise CircuitOpenError("Ollama is unavailable (circuit open on every backend)")
+        healthy = [b for b in available if b.healthy]
+        if healthy:
+            return healthy
+        # Nothing known to be healthy: try every host rather than fail outright
+        return available
+
+    def get_models(self) -> List[Dict[str, Any]]:
+        """Union of the models installed on the healthy hosts."""
+        models: Dict[str, Dict[str, Any]] = {}
+        errors = []
+        for backend in self._candidates():
+            try:
+                for model in backend.models.get_models():
+                    models.setdefault(model.get('name', ''), model)
+            except Exception as e:
+                backend.record_fetch_failure(e)
+                errors.append(e)
+        if not models and errors:
+            raise errors[-1]
+        return list(models.values())
+
+    def resolve_model(self, preferred: str) -> str:
+        """Return ``preferred`` if any healthy host has it, otherwise the first available model."""
+        return select_model(preferred, self.get_models())
+
+    def invalidate_models(self, url: Optional[str] = None) -> None:
+        for backend in self.backends:
+            if url is None or backend.url == url:
+                backend.models.invalidate()
+
+    @contextmanager
+    def acquire(self, model: str) -> Iterator[OllamaBackend]:
+        """Reserve the least-loaded healthy host that has ``model`` installed.
+
+        Raises CircuitOpenError without calling Ollama when the circuit of
+        every host that has the model is open.
+        """
+        candidates = [b for b in self._candidates() if model in b.model_names()]
+        if not candidates:
+            raise LLMServiceError(f"No healthy Ollama backend has model {model}")
+        backend = None
+        with self._lock:
+            for candidate in sorted(candidates, key=lambda b: b.in_flight):
+                if candidate.breaker.allow():
+                    backend = candidate
+                    break
+            if backend is None:
+                raise CircuitOpenError(f"Ollama is unavailable (circuit open) for model {model}")
+            backend.in_flight += 1
+        LLM_IN_FLIGHT.inc(backend=backend.url)
+        recorded = False
+        try:
+            yield backend
+        except Exception as e:
+            recorded = True
+            if is_retryable(e):
+                backend.breaker.record_failure()
+            else:
+                # The host answered; the failure is not its health's fault
+                backend.breaker.record_success()
+            if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout)):
+                backend.mark_unhealthy(e)
+            raise
+        else:
+            recorded = True
+            backend.breaker.record_success()
+        finally:
+            if not recorded:
+                # GeneratorExit or KeyboardInterrupt: the caller went away
+                # before the host answered, which says nothing about its health
+                backend.breaker.release()
+            with self._lock:
+                backend.in_flight -= 1
+            LLM_IN_FLIGHT.dec(backend=backend.url)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [backend.stats() for backend in self.backends]
+
+
+def parse_base_urls(value: Optional[str]) -> List[str]:
+    """Split a comma-separated OLLAMA_BASE_URLS value."""
+    return [url.strip() for url in (value or '').split(',') if url.strip()]
+
+
+def default_base_urls() -> List[str]:
+    return parse_base_urls(os.getenv('OLLAMA_BASE_URLS')) or [
+        os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+    ]
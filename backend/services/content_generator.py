@@ -1,69 +1,76 @@
-import json
-from services.ai_service import get_llm_response
+import logging
+from services.qcm_parser import QCMParser, parse_qcm
+from services.ai_service import OLLAMA_MODEL, get_llm_response, stream_llm_response
+from services.generation_cache import cached_generation, generation_cache
+from services.logging_setup import log_payload
+from services.prompts import QCM_PROMPT
 
-def generate_educational_content(subject, grade):
-    """Generate educational content using AI."""
-    print(f"\n=== Generating content ===")
-    print(f"Subject: {subject}")
-    print(f"Grade: {grade}")
-    
-    prompt = f"""You are an expert teacher creating educational content. Create a multiple-choice question about {subject} for {grade} level students.
+logger = logging.getLogger(__name__)
 
-    Follow this format exactly:
-    QUESTION: [Write a clear, engaging question]
-    OPTIONS:
-    1. [First option]
-    2. [Second option]
-    3. [Third option]
-    4. [Fourth option]
-    CORRECT_ANSWER: [Number 1-4]
-    EXPLANATION: [Brief explanation of why this is correct]
+def build_qcm_prompt(subject, grade):
+    """Build the QCM prompt for a subject and grade."""
+    return QCM_PROMPT.render(subject=subject, grade=grade)
 
-    Guidelines:
-    - Make the question clear and appropriate for {grade} level
-    - Include exactly 4 options
-    - Make one option clearly correct
-    - Make other options plausible but incorrect
-    - Keep the explanation simple and educational
+def validate_qcm_response(response):
+    """Raise ValueError if the LLM response is not a usable QCM.
+
+    Returns the ParsedQCM so callers do not parse the response again.
     """
+    if not response or len(response.strip()) < 10:
+        raise ValueError("Invalid response from AI model")
+        
+    parsed = parse_qcm(response)
+    parsed.validate()
+    return parsed
+
+@cached_generation('qcm', QCM_PROMPT.version_id, OLLAMA_MODEL)
+def generate_educational_content(subject, grade):
+    """Generate educational content using AI."""
+    logger.info("Generating QCM content", extra={'subject': subject, 'grade': grade})
+    
+    prompt = build_qcm_prompt(subject, grade)
     
     try:
         # Get response from Ollama
-        response = get_llm_response(prompt)
-        print("Raw response:", response)
+        response = get_llm_response(prompt, options=QCM_PROMPT.options)
+        log_payload(logger, "Raw QCM response", response)
         
-        # Validate response format
-        if not response or len(response.strip()) < 10:
-            raise ValueError("Invalid response from AI model")
-            
-        # Normalize the response for validation
-        normalized_response = response.upper()
-        
-        # Define section headers with common typos
-        section_headers = {
-            'QUESTION': ['QUESTION:', 'QUESTION'],
-            'OPTIONS': ['OPTIONS:', 'OPTIONS'],
-            'CORRECT_ANSWER': ['CORRECT_ANSWER:', 'CORRECT_ANSWER', 'CORRECT ANSWER:', 'CORRECT ANSWER'],
-            'EXPLANATION': ['EXPLANATION:', 'EXPLANATION']
-        }
-        
-        # Check for each required section
-        missing_sections = []
-        for section, possible_headers in section_headers.items():
-            if not any(header in normalized_response for header in possible_headers):
-                missing_sections.append(section)
-                
-        if missing_sections:
-            raise ValueError(f"Response missing required sections: {', '.join(missing_sections)}")
-            
-        # Check for placeholder text
-        placeholder_texts = ['[WRITE', '[NUMBER', '[YOUR', '[FIRST', '[SECOND', '[THIRD', '[FOURTH']
-        for placeholder in placeholder_texts:
-            if placeholder in normalized_response:
-                raise ValueError("Response contains placeholder text instead of actual content")
-                
+        validate_qcm_response(response)
         return response
             
     except Exception as e:
-        print(f"Failed to generate content: {str(e)}")
-        raise 
\ No newline at end of file
+        logger.warning("Failed to generate content: %s", e)
+        raise 
+
+def stream_educational_content(subject, grade, use_cache=True):
+    """Stream a QCM as it is generated.
+
+    Yields ``('token', text)`` for every token, ``('section', {...})`` each
+    time a QUESTION / OPTIONS / CORRECT_ANSWER / EXPLANATION section is
+    complete, and finally ``('complete', response)`` with the validated text.
+    A cached generation is replayed as a single token.
+    """
+    logger.info("Streaming QCM content", extra={'subject': subject, 'grade': grade})
+
+    key = generate_educational_content.cache_key(subject, grade)
+    cached = generation_cache.get(key) if use_cache else None
+    if cached is not None:
+        tokens = [cached]
+    else:
+        tokens = stream_llm_response(build_qcm_prompt(subject, grade), options=QCM_PROMPT.options)
+    parser = QCMParser()
+    chunks = []
+
+    for token in tokens:
+        chunks.append(token)
+        yield 'token', token
+        for section in parser.feed(token):
+            yield 'section', section
+    for section in parser.close():
+        yield 'section', section
+
+    response = ''.join(chunks).strip()
+    validate_qcm_response(response)
+    if cached is None:
+        generation_cache.set(key, response)
+    yield 'complete', response
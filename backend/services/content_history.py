@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from extensions import db
+from models.models import Content, Request, utc_isoformat
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Columns returned by the summary view, which skips the large content_data
+SUMMARY_COLUMNS = (
+    Content.id,
+    Content.request_id,
+    Content.title,
+    Content.content_type,
+    Content.prompt_version,
+    Content.created_at,
+    Request.topic,
+    Request.level,
+)
+FULL_COLUMNS = SUMMARY_COLUMNS + (Content.content_data, Content.structured_data)
+
+
+class InvalidCursorError(ValueError):
+    """The pagination cursor could not be decoded."""
+
+
+def encode_cursor(created_at: datetime, content_id: int) -> str:
+    """Opaque cursor pointing after the given row."""
+    raw = json.dumps({'t': created_at.isoformat(), 'id': content_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data['t']), int(data['id'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def get_history(user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                content_type: Optional[str] = None, topic: Optional[str] = None,
+                level: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
+    """One page of a user's contents, newest first.
+
+    Pages are walked with a keyset on ``(created_at, id)`` rather than
+    OFFSET, so every page is a range scan of the ``(user_id, created_at, id)``
+    index however deep into the history it is. With a topic or level filter
+    the matching requests are found first, through ``(user_id, topic, level)``,
+    and their contents through ``(request_id, created_at, id)``.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    columns = SUMMARY_COLUMNS if summary else FULL_COLUMNS
+
+    query = (
+        db.select(*columns)
+        .join(Request, Request.id == Content.request_id)
+        .where(Content.user_id == user_id)
+    )
+    if content_type:
+        query = query.where(Content.content_type == content_type)
+    if topic or level:
+        # Redundant with Content.user_id, but lets the planner start from
+        # the requests index, whose leading column is user_id
+        query = query.where(Request.user_id == user_id)
+    if topic:
+        query = query.where(Request.topic == topic)
+    if level:
+        query = query.where(Request.level == level)
+    if cursor:
+        created_at, content_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Content.created_at < created_at,
+            and_(Content.created_at == created_at, Content.id < content_id)
+        ))
+
+    # One extra row tells whether there is a next page
+    rows = db.session.execute(
+        query.order_by(Content.created_at.desc(), Content.id.desc()).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items: List[Dict[str, Any]] = []
+    for row in rows:
+        item = {
+            'id': row.id,
+            'request_id': row.request_id,
+            'title': row.title,
+            'content_type': row.content_type,
+            'prompt_version': row.prompt_version,
+            'topic': row.topic,
+            'level': row.level,
+            'created_at': utc_isoformat(row.created_at)
+        }
+        if not summary:
+            item['content_data'] = row.content_data
+            item['structured_data'] = row.structured_data
+        items.append(item)
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return {'items': items, 'next_cursor': next_cursor, 'has_more': has_more}
@@ -0,0 +1,103 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import URL, make_url
+
+# Bind key of the optional read replica (DATABASE_REPLICA_URL)
+REPLICA_BIND = 'replica'
+
+_read_only: ContextVar[bool] = ContextVar('read_only', default=False)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def database_uri() -> str:
+    """Primary database URL: DATABASE_URL, or built from the DB_* variables."""
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+    port = os.getenv('DB_PORT')
+    return URL.create(
+        os.getenv('DB_DRIVER', 'mysql+pymysql'),
+        username=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD') or None,
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(port) if port else None,
+        database=os.getenv('DB_NAME', 'dbedu')
+    ).render_as_string(hide_password=False)
+
+
+def engine_options(uri: str) -> Dict[str, Any]:
+    """Pool settings for an engine.
+
+    Connections are checked with a ping before use and recycled before
+    MySQL's ``wait_timeout`` closes them, since long LLM calls leave them
+    idle between uses. SQLite picks its own pool, so it only gets pre-ping.
+    """
+    options: Dict[str, Any] = {'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True)}
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return options
+    options.update(
+        pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    )
+    return options
+
+
+def configure_database(app) -> None:
+    """Fill the SQLAlchemy settings from the environment.
+
+    Values already set on ``app.config`` (e.g. by tests) are kept.
+    """
+    uri = app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(uri))
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+
+    replica_uri = os.getenv('DATABASE_REPLICA_URL')
+    if replica_uri:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND, dict(engine_options(replica_uri), url=replica_uri))
+
+
+class RoutingSession(Session):
+    """Session sending the reads of read-only endpoints to the replica.
+
+    Inside ``read_only`` scopes, SELECTs go to the replica bind when one is
+    configured; flushes and any other statement always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and _read_only.get() and not self._flushing
+                and getattr(clause, 'is_select', False)):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads():
+    """Route the SELECTs of the enclosed block to the replica, if any."""
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def read_only(fn):
+    """Decorator for read-only endpoints: their queries may hit the replica."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return fn(*args, **kwargs)
+    return wrapper
+
@@ -0,0 +1,451 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from extensions import db
+from models.models import Content, Request
+from services.job_queue import JobQueue
+from services.structured_content import build_structured_data
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('pdf', 'docx')
+SCOPES = ('content', 'request', 'history')
+MIMETYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+# Imported only by the worker that renders the format
+PACKAGES = {'pdf': 'reportlab', 'docx': 'python-docx'}
+# Bump when the layout changes so cached files are rendered again
+RENDER_VERSION = '1'
+# Rows fetched per round trip while streaming a document
+FETCH_SIZE = 100
+# How long a failed render stays visible to clients polling its status
+FAILED_JOB_TTL = 15 * 60
+# Queued and partial files older than this were left by a stopped worker
+MARKER_TTL = 3600
+
+CONTENT_LABELS = {'qcm': 'QCM', 'exercise': 'Exercise', 'summary': 'Summary'}
+FIELD_LABELS = (
+    ('description', 'Description'),
+    ('steps', 'Steps'),
+    ('solution', 'Solution'),
+    ('hints', 'Hints'),
+    ('key_points', 'Key points'),
+    ('main_concepts', 'Main concepts'),
+    ('examples', 'Examples'),
+    ('conclusion', 'Conclusion'),
+)
+NUMBERED_FIELDS = {'steps'}
+
+_EXPORT_ID_RE = re.compile(r'^(content-\d+|request-\d+|history)-[0-9a-f]{64}$')
+
+# ('title' | 'heading' | 'meta' | 'label' | 'paragraph', text) or ('bullets' | 'numbered', [items])
+Block = Tuple[str, Any]
+
+
+class ExportNotFound(LookupError):
+    """Raised when there is nothing of the user's to export."""
+
+
+class ExportQueueFull(RuntimeError):
+    """Raised when the export worker pool refuses more work."""
+
+
+def _text(value: Any) -> str:
+    return '' if value is None else str(value).strip()
+
+
+def _question_blocks(question: Dict[str, Any], label: str) -> List[Block]:
+    options = [_text(option) for option in question.get('options') or []]
+    blocks: List[Block] = [('label', label), ('paragraph', _text(question.get('question')))]
+    if options:
+        blocks.append(('numbered', options))
+    answer = question.get('correct_answer')
+    index = question.get('answer_index')
+    # JSON-mode QCMs store the 0-based index as correct_answer
+    if index is None and isinstance(answer, int) and not isinstance(answer, bool):
+        index = answer
+    if isinstance(index, int) and 0 <= index < len(options):
+        blocks.append(('paragraph', f"Answer: {index + 1}. {options[index]}"))
+    elif _text(answer):
+        blocks.append(('paragraph', f"Answer: {_text(answer)}"))
+    if _text(question.get('explanation')):
+        blocks.append(('paragraph', f"Explanation: {_text(question['explanation'])}"))
+    return blocks
+
+
+def content_blocks(row: Any) -> List[Block]:
+    """Layout-independent description of one content: what both renderers draw."""
+    meta = [CONTENT_LABELS.get(row.content_type, row.content_type), row.topic, row.level,
+            row.created_at.strftime('%Y-%m-%d') if row.created_at else None]
+    blocks: List[Block] = [('heading', _text(row.title)), ('meta', ' · '.join(_text(m) for m in meta if m))]
+
+    data = row.structured_data
+    if data is None:
+        data = build_structured_data(row.content_type, row.content_data)
+    if not isinstance(data, dict):
+        blocks.append(('paragraph', _text(row.content_data)))
+        return blocks
+
+    body: List[Block] = []
+    questions = data.get('questions')
+    if not isinstance(questions, list):
+        questions = [data] if data.get('question') else []
+    for number, question in enumerate(q for q in questions if isinstance(q, dict)):
+        body.extend(_question_blocks(question, f"Question {number + 1}" if len(questions) > 1 else 'Question'))
+    for field, label in FIELD_LABELS:
+        value = data.get(field)
+        if isinstance(value, list) and value:
+            body.extend([('label', label), ('numbered' if field in NUMBERED_FIELDS else 'bullets',
+                                            [_text(item) for item in value])])
+        elif _text(value) and not isinstance(value, (list, dict)):
+            body.extend([('label', label), ('paragraph', _text(value))])
+
+    blocks.extend(body or [('paragraph', _text(row.content_data))])
+    return blocks
+
+
+def _rows(user_id: int, scope: str, target_id: Optional[int]) -> Iterator[Any]:
+    """The contents to export, oldest first, streamed ``FETCH_SIZE`` rows at a time."""
+    stmt = (
+        select(Content.id, Content.title, Content.content_type, Content.content_data,
+               Content.structured_data, Content.created_at, Request.topic, Request.level)
+        .join(Request, Content.request_id == Request.id)
+        .where(Content.user_id == user_id)
+        .order_by(Content.created_at, Content.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    if scope == 'content':
+        stmt = stmt.where(Content.id == target_id)
+    elif scope == 'request':
+        stmt = stmt.where(Content.request_id == target_id)
+    return iter(db.session.execute(stmt))
+
+
+def _version(user_id: int, scope: str, target_id: Optional[int]) -> Tuple[int, Optional[int], Any]:
+    """Count, last id and last change of the contents to export, in one aggregate query.
+
+    Contents are only ever added, deleted or updated (which bumps
+    ``updated_at``), so these three change whenever the export would.
+    """
+    stmt = (
+        select(func.count(Content.id), func.max(Content.id),
+               func.max(func.coalesce(Content.updated_at, Content.created_at)))
+        .where(Content.user_id == user_id)
+    )
+    if scope == 'content':
+        stmt = stmt.where(Content.id == target_id)
+    elif scope == 'request':
+        stmt = stmt.where(Content.request_id == target_id)
+    count, last_id, last_change = db.session.execute(stmt).one()
+    return count, last_id, last_change
+
+
+def _document_title(user_id: int, scope: str, target_id: Optional[int]) -> str:
+    if scope == 'content':
+        return db.session.scalar(select(Content.title).where(Content.id == target_id)) or 'Content'
+    if scope == 'request':
+        row = db.session.execute(select(Request.topic, Request.level).where(Request.id == target_id)).first()
+        return f"{row.topic} ({row.level})" if row else 'Request'
+    return 'Generation history'
+
+
+class _PdfWriter:
+    """Draws blocks page by page on a reportlab canvas.
+
+    Only the finished, compressed page streams stay in memory; nothing is
+    laid out ahead of the page being drawn.
+    """
+
+    MARGIN = 56
+    STYLES = {
+        'title': ('Helvetica-Bold', 18, 10),
+        'heading': ('Helvetica-Bold', 14, 4),
+        'meta': ('Helvetica-Oblique', 9, 8),
+        'label': ('Helvetica-Bold', 11, 2),
+        'paragraph': ('Helvetica', 11, 6),
+        'bullets': ('Helvetica', 11, 6),
+        'numbered': ('Helvetica', 11, 6),
+    }
+
+    def __init__(self, path: str, title: str):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.utils import simpleSplit
+        from reportlab.pdfgen import canvas
+
+        self._split = simpleSplit
+        self.width, self.height = A4
+        self.canvas = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle(title)
+        self.y = self.height - self.MARGIN
+
+    def _draw_lines(self, text: str, font: str, size: int, indent: float = 0, marker: str = '') -> None:
+        """Draw wrapped text; ``marker`` ("• ", "2. ") hangs before the first line."""
+        offset = indent + (self.canvas.stringWidth(marker, font, size) if marker else 0)
+        width = self.width - 2 * self.MARGIN - offset
+        leading = size * 1.3
+        lines = [line for source in (text.splitlines() or ['']) for line in (self._split(source, font, size, width) or [''])]
+        for number, line in enumerate(lines):
+            if self.y - leading < self.MARGIN:
+                self.canvas.showPage()
+                self.y = self.height - self.MARGIN
+            self.y -= leading
+            self.canvas.setFont(font, size)
+            if marker and number == 0:
+                self.canvas.drawString(self.MARGIN + indent, self.y, marker)
+            self.canvas.drawString(self.MARGIN + offset, self.y, line)
+
+    def write(self, kind: str, value: Any) -> None:
+        font, size, space_after = self.STYLES[kind]
+        if kind == 'heading':
+            self.y -= 10
+        if kind in ('bullets', 'numbered'):
+            for number, item in enumerate(value, start=1):
+                self._draw_lines(item, font, size, indent=12,
+                                 marker=f"{number}. " if kind == 'numbered' else '• ')
+        else:
+            self._draw_lines(value, font, size)
+        self.y -= space_after
+
+    def close(self) -> None:
+        self.canvas.save()
+
+
+class _DocxWriter:
+    """Appends blocks to a python-docx document, saved once at the end."""
+
+    def __init__(self, path: str, title: str):
+        from docx import Document
+
+        self.path = path
+        self.document = Document()
+        self.document.core_properties.title = title
+
+    def write(self, kind: str, value: Any) -> None:
+        document = self.document
+        if kind == 'title':
+            document.add_heading(value, level=0)
+        elif kind == 'heading':
+            document.add_heading(value, level=1)
+        elif kind in ('meta', 'label'):
+            run = document.add_paragraph().add_run(value)
+            run.italic = kind == 'meta'
+            run.bold = kind == 'label'
+        elif kind == 'bullets':
+            for item in value:
+                document.add_paragraph(item, style='List Bullet')
+        elif kind == 'numbered':
+            # 'List Number' keeps counting across lists, so number by hand
+            for number, item in enumerate(value, start=1):
+                document.add_paragraph(f"{number}. {item}")
+        else:
+            document.add_paragraph(value)
+
+    def close(self) -> None:
+        self.document.save(self.path)
+
+
+WRITERS = {'pdf': _PdfWriter, 'docx': _DocxWriter}
+
+
+class ExportService:
+    """Renders PDF/DOCX exports on a background pool into a disk cache.
+
+    Files are named after a hash of the format, the layout version and
+    the count, last id and last update of the exported contents, so an
+    unchanged export is served from disk after one aggregate query and any
+    change in the contents renders a new file. Each user has their own
+    directory.
+
+    The status of an export is read from that directory, never from this
+    process's memory, so any worker can answer for a render started by
+    another: next to ``<export id>.<format>`` a ``.queued`` marker means it
+    waits for a render worker, a ``.part`` file that it is being rendered
+    and a ``.failed`` file (holding the error) that the last attempt
+    failed. Files unused for ``cache_ttl`` seconds, failure markers older
+    than ``FAILED_JOB_TTL`` and abandoned markers are pruned after each
+    render.
+    """
+
+    def __init__(self, export_dir: Optional[str] = None, cache_ttl: float = 7 * 24 * 3600,
+                 max_workers: int = 2, max_pending: int = 20):
+        self.export_dir = export_dir or os.path.join(tempfile.gettempdir(), 'educato-exports')
+        self.cache_ttl = cache_ttl
+        self.queue = JobQueue(max_workers=max_workers, max_pending=max_pending, name='export-worker')
+
+    def init_app(self, app) -> None:
+        self.export_dir = app.config.get('EXPORT_DIR') or self.export_dir
+        self.cache_ttl = float(app.config.get('EXPORT_CACHE_TTL', self.cache_ttl))
+        self.queue.init_app(app, prefix='EXPORT')
+        app.extensions['exports'] = self
+
+    @staticmethod
+    def is_export_id(export_id: str) -> bool:
+        return bool(_EXPORT_ID_RE.match(export_id or ''))
+
+    def _path(self, user_id: int, export_id: str, fmt: str) -> str:
+        return os.path.join(self.export_dir, str(int(user_id)), f"{export_id}.{fmt}")
+
+    def _digest(self, user_id: int, scope: str, target_id: Optional[int], fmt: str) -> Tuple[str, int]:
+        count, last_id, last_change = _version(user_id, scope, target_id)
+        key = json.dumps([RENDER_VERSION, fmt, user_id, scope, target_id, count, last_id,
+                          last_change.isoformat() if last_change else None])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest(), count
+
+    def _state(self, path: str) -> Optional[Dict[str, Any]]:
+        """Status and error of the export at ``path``, from the files next to it."""
+        if os.path.exists(path):
+            return {'status': 'ready', 'error': None}
+        if glob.glob(f"{glob.escape(path)}.*.part"):
+            return {'status': 'running', 'error': None}
+        if os.path.exists(f"{path}.queued"):
+            return {'status': 'queued', 'error': None}
+        try:
+            if time.time() - os.path.getmtime(f"{path}.failed") < FAILED_JOB_TTL:
+                with open(f"{path}.failed", encoding='utf-8') as failed:
+                    return {'status': 'failed', 'error': failed.read()}
+        except OSError:
+            pass
+        return None
+
+    def request_export(self, user_id: int, scope: str, target_id: Optional[int], fmt: str) -> Dict[str, Any]:
+        """Start rendering unless the file is cached or already being rendered.
+
+        Returns the export status; raises ExportNotFound when there is no
+        content to export and ExportQueueFull when the pool is saturated.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+        digest, count = self._digest(user_id, scope, target_id, fmt)
+        if not count:
+            raise ExportNotFound('Nothing to export')
+        prefix = scope if scope == 'history' else f"{scope}-{target_id}"
+        export_id = f"{prefix}-{digest}"
+
+        path = self._path(user_id, export_id, fmt)
+        if os.path.exists(path):
+            # Served again: keep it away from the pruning
+            os.utime(path)
+            return self.status(user_id, export_id)
+        state = self._state(path)
+        if state is not None and state['status'] in ('queued', 'running'):
+            return self.status(user_id, export_id)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            # O_EXCL: of concurrent requests, in any worker, only one queues the render
+            os.close(os.open(f"{path}.queued", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return self.status(user_id, export_id)
+        _remove(f"{path}.failed")
+        if not self.queue.submit(self._render, user_id, scope, target_id, fmt, export_id):
+            _remove(f"{path}.queued")
+            raise ExportQueueFull('Export queue is full, try again later')
+        return self.status(user_id, export_id)
+
+    def _render(self, user_id: int, scope: str, target_id: Optional[int], fmt: str, export_id: str) -> None:
+        path = self._path(user_id, export_id, fmt)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        started = time.perf_counter()
+        try:
+            # The partial file marks the render as running before the marker goes
+            open(partial, 'wb').close()
+            _remove(f"{path}.queued")
+            title = _document_title(user_id, scope, target_id)
+            writer = WRITERS[fmt](partial, title)
+            if scope != 'content':
+                writer.write('title', title)
+            for row in _rows(user_id, scope, target_id):
+                for kind, value in content_blocks(row):
+                    writer.write(kind, value)
+            writer.close()
+            # Readers only ever see complete files
+            os.replace(partial, path)
+            logger.info("Rendered export", extra={
+                'export_id': export_id, 'user_id': user_id,
+                'bytes': os.path.getsize(path), 'duration_s': round(time.perf_counter() - started, 3)
+            })
+        except Exception as e:
+            if isinstance(e, ImportError):
+                error = f"{fmt.upper()} export needs the {PACKAGES[fmt]} package"
+            else:
+                error = str(e)
+            logger.exception("Export %s failed", export_id)
+            try:
+                with open(f"{path}.failed", 'w', encoding='utf-8') as failed:
+                    failed.write(error)
+            except OSError:
+                logger.warning("Could not record the failure of export %s", export_id, exc_info=True)
+            _remove(f"{path}.queued")
+            _remove(partial)
+        self.prune()
+
+    def find(self, user_id: int, export_id: str) -> Optional[Tuple[str, str]]:
+        """Path and format of a rendered export of this user, if it exists."""
+        for fmt in FORMATS:
+            path = self._path(user_id, export_id, fmt)
+            if os.path.exists(path):
+                return path, fmt
+        return None
+
+    def status(self, user_id: int, export_id: str) -> Optional[Dict[str, Any]]:
+        """Status of an export, or None if this user has no such export."""
+        for fmt in FORMATS:
+            state = self._state(self._path(user_id, export_id, fmt))
+            if state is not None:
+                return {'export_id': export_id, 'status': state['status'], 'format': fmt, 'error': state['error']}
+        return None
+
+    def download_name(self, export_id: str, fmt: str) -> str:
+        return f"{export_id.rsplit('-', 1)[0]}.{fmt}"
+
+    def prune(self) -> int:
+        """Delete exports unused for ``cache_ttl`` seconds, old failure markers
+        and the markers of renders abandoned by a stopped worker."""
+        removed = 0
+        now = time.time()
+        for directory, _, filenames in os.walk(self.export_dir):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename.endswith('.failed'):
+                    ttl = FAILED_JOB_TTL
+                elif filename.endswith(('.part', '.queued')):
+                    ttl = MARKER_TTL
+                else:
+                    ttl = self.cache_ttl
+                try:
+                    if now - os.path.getmtime(path) > ttl:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    # Renamed or removed by another worker meanwhile
+                    continue
+        return removed
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+exports = ExportService(
+    export_dir=os.getenv('EXPORT_DIR') or None,
+    cache_ttl=float(os.getenv('EXPORT_CACHE_TTL', str(7 * 24 * 3600))),
+    max_workers=int(os.getenv('EXPORT_WORKERS', '2')),
+    max_pending=int(os.getenv('EXPORT_QUEUE_SIZE', '20'))
+)
@@ -0,0 +1,198 @@
+import copy
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional, Tuple
+
+from services.singleflight import generation_flight
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str, str, str]
+
+
+def normalize_key_part(value: Any) -> str:
+    """Trim, collapse inner whitespace and case-fold a key component."""
+    return ' '.join(str(value).split()).casefold()
+
+
+def make_cache_key(kind: str, version: str, subject: Any, grade: Any, model: str) -> CacheKey:
+    """Build the exact-match key of a generation."""
+    return (kind, version, normalize_key_part(subject), normalize_key_part(grade), model)
+
+
+class GenerationCache:
+    """Exact-match LRU cache of LLM generations with a time-to-live.
+
+    Entries are keyed on (content kind, prompt template version, subject,
+    grade, model), so changing the prompt or the model never serves stale
+    output. The least recently used entry is evicted once ``max_size`` is
+    reached and entries older than ``ttl`` seconds are dropped on access.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._warmer: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        """Configure the cache from the app config.
+
+        Warming from the database is deferred to a background thread started
+        by the first request, so creating the app touches neither the
+        database nor any thread.
+        """
+        self.max_size = int(app.config.get('GENERATION_CACHE_SIZE', self.max_size))
+        self.ttl = float(app.config.get('GENERATION_CACHE_TTL', self.ttl))
+        app.extensions['generation_cache'] = self
+        if app.config.get('GENERATION_CACHE_WARM', True):
+            def start_warming():
+                if self._warmer is None:
+                    with self._lock:
+                        if self._warmer is None:
+                            self._warmer = threading.Thread(target=self._warm_in_background, args=(app,),
+                                                            name='generation-cache-warmer', daemon=True)
+                            self._warmer.start()
+            app.before_request(start_warming)
+
+    def _warm_in_background(self, app) -> None:
+        with app.app_context():
+            try:
+                warmed = self.warm_from_contents()
+                logger.info("Warmed generation cache with %d entries", warmed)
+            except Exception as e:
+                logger.warning("Could not warm generation cache: %s", e)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may mutate the dicts they get back
+        return value if isinstance(value, str) else copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """Store a value; ``age`` back-dates entries restored from the database."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() - age, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or the whole cache when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def warm_from_contents(self) -> int:
+        """Load the most recent QCMs stored in ``contents`` into the cache.
+
+        Only rows generated from the current QCM template are restored,
+        keyed like live generations under the configured model. Must be
+        called inside an application context.
+        """
+        from models.models import Content, Request
+        from services.ai_service import OLLAMA_MODEL
+        from services.prompts import QCM_PROMPT
+
+        rows = (
+            Content.query
+            .join(Request, Content.request_id == Request.id)
+            .with_entities(Request.topic, Request.level, Content.content_data, Content.created_at)
+            .filter(Content.content_type == 'qcm', Content.prompt_version == QCM_PROMPT.version_id)
+            .order_by(Content.created_at.desc())
+            .limit(self.max_size)
+            .all()
+        )
+
+        now = datetime.utcnow()
+        warmed = 0
+        # Oldest first so the most recent generations end up most recently used
+        for topic, level, content_data, created_at in reversed(rows):
+            age = (now - created_at).total_seconds() if created_at else 0.0
+            if age >= self.ttl:
+                continue
+            key = make_cache_key('qcm', QCM_PROMPT.version_id, topic, level, OLLAMA_MODEL)
+            self.set(key, content_data, age=max(age, 0.0))
+            warmed += 1
+        return warmed
+
+
+generation_cache = GenerationCache(
+    max_size=int(os.getenv('GENERATION_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('GENERATION_CACHE_TTL', '3600'))
+)
+
+
+def cached_generation(kind: str, version: str, model: str):
+    """Serve a generator's result from ``generation_cache``.
+
+    The wrapped function must take the subject/topic and the grade/level as
+    its first two arguments. Keys use the configured ``model`` name rather
+    than the model Ollama resolves it to, so a cache hit needs no call to
+    Ollama, and the keys match the ones ``warm_from_contents`` builds. Callers can pass ``use_cache=False`` to force a
+    fresh generation; its result still replaces the cached one. On a miss
+    the call goes through ``generation_flight``, so concurrent identical
+    requests share a single LLM call.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cache_key(*args, **kwargs) -> CacheKey:
+            arguments = list(signature.bind(*args, **kwargs).arguments.values())
+            return make_cache_key(kind, version, arguments[0], arguments[1], model)
+
+        @functools.wraps(func)
+        def wrapper(*args, use_cache: bool = True, **kwargs):
+            key = cache_key(*args, **kwargs)
+            if use_cache:
+                cached = generation_cache.get(key)
+                if cached is not None:
+                    logger.debug("Generation cache hit for %s", key)
+                    return cached
+            result, shared = generation_flight.do(key, lambda: func(*args, **kwargs))
+            if isinstance(result, str):
+                if not shared:
+                    generation_cache.set(key, result)
+                return result
+            if not shared:
+                generation_cache.set(key, copy.deepcopy(result))
+            return copy.deepcopy(result)
+
+        wrapper.cache_key = cache_key
+        # Recorded on the contents the result is stored in
+        wrapper.prompt_version = version
+        return wrapper
+    return decorator
@@ -0,0 +1,169 @@
+import copy
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from extensions import db
+from models.models import User
+
+logger = logging.getLogger(__name__)
+
+Profile = Dict[str, Any]
+
+
+class IdentityCache:
+    """Per-process LRU cache of user profiles keyed by JWT identity.
+
+    Saves the user lookup of authenticated requests. Entries expire after
+    ``ttl`` seconds, which bounds how stale a profile can be in the other
+    worker processes; the process handling a change calls ``invalidate``.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        # str(identity) -> (stored_at, profile)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        self.max_size = int(app.config.get('IDENTITY_CACHE_SIZE', self.max_size))
+        self.ttl = float(app.config.get('IDENTITY_CACHE_TTL', self.ttl))
+        app.extensions['identity_cache'] = self
+
+    @staticmethod
+    def _key(identity: Any) -> str:
+        return str(identity)
+
+    def get(self, identity: Any) -> Optional[Profile]:
+        key = self._key(identity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, profile = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(profile)
+
+    def set(self, identity: Any, profile: Profile) -> None:
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[self._key(identity)] = (time.monotonic(), copy.deepcopy(profile))
+            self._entries.move_to_end(self._key(identity))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, identity: Any = None) -> None:
+        """Drop one user's profile, or every profile when no identity is given."""
+        with self._lock:
+            if identity is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(identity), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+identity_cache = IdentityCache(
+    max_size=int(os.getenv('IDENTITY_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('IDENTITY_CACHE_TTL', '60'))
+)
+
+
+def _load_profile(identity: Any) -> Optional[Profile]:
+    try:
+        user_id = int(identity)
+    except (TypeError, ValueError):
+        return None
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return dict(user.to_dict(), is_active=bool(user.is_active))
+
+
+def resolve_identity(identity: Any) -> Optional[Profile]:
+    """Profile of the user behind a JWT identity, from the cache when possible."""
+    if identity is None:
+        return None
+    profile = identity_cache.get(identity)
+    if profile is None:
+        profile = _load_profile(identity)
+        if profile is not None:
+            identity_cache.set(identity, profile)
+    return profile
+
+
+def current_user_profile() -> Optional[Profile]:
+    """Profile resolved by ``identity_required`` for the current request."""
+    return g.get('current_user')
+
+
+def identity_required(fn: Callable) -> Callable:
+    """Like ``jwt_required()``, and resolves the user into ``g.current_user``.
+
+    Answers 401 when the token has no identity, 404 when the user no longer
+    exists and 403 when the account is disabled. OPTIONS preflights go
+    through untouched.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.method == 'OPTIONS':
+            return fn(*args, **kwargs)
+        verify_jwt_in_request()
+        identity = get_jwt_identity()
+        if not identity:
+            logger.info("No user ID found in token")
+            return jsonify({'error': 'No user ID found in token'}), 401
+        profile = resolve_identity(identity)
+        if profile is None:
+            logger.info("User not found for ID %s", identity)
+            return jsonify({'error': 'User not found'}), 404
+        if not profile.get('is_active', True):
+            logger.info("Inactive user %s", identity)
+            return jsonify({'error': 'Account disabled'}), 403
+        g.current_user = profile
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def is_admin(profile: Optional[Profile]) -> bool:
+    """Whether the profile's email is listed in ADMIN_EMAILS."""
+    if not profile or not profile.get('email'):
+        return False
+    admins = {email.casefold() for email in current_app.config.get('ADMIN_EMAILS', ())}
+    return profile['email'].casefold() in admins
+
+
+def admin_required(fn: Callable) -> Callable:
+    """``identity_required``, plus 403 unless the user is an administrator."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.method != 'OPTIONS' and not is_admin(current_user_profile()):
+            logger.info("Rejected non-admin user on %s", request.path)
+            return jsonify({'error': 'Administrator access required'}), 403
+        return fn(*args, **kwargs)
+    return identity_required(wrapper)
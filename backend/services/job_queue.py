@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Bounded worker pool that runs background jobs inside an app context.
+
+    At most ``max_workers`` jobs run at once and at most ``max_pending``
+    more may wait; ``submit`` refuses work beyond that instead of letting
+    the backlog grow without limit. Workers are started on first use.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, name: str = 'generation-worker'):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.name = name
+        self.app = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def init_app(self, app, prefix: str = 'GENERATION') -> None:
+        self.app = app
+        self.max_workers = int(app.config.get(f'{prefix}_WORKERS', self.max_workers))
+        self.max_pending = int(app.config.get(f'{prefix}_QUEUE_SIZE', self.max_pending))
+        app.extensions.setdefault('job_queues', {})[self.name] = self
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.name
+                    )
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """Queue ``fn`` for execution; return False when the queue is full."""
+        executor = self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            return False
+        executor.submit(self._run, fn, args, kwargs)
+        return True
+
+    def submit_future(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Optional[Future]:
+        """Like ``submit``, for callers that wait for the result; None when the queue is full."""
+        executor = self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            return None
+        return executor.submit(self._run, fn, args, kwargs, reraise=True)
+
+    def _run(self, fn: Callable[..., Any], args: tuple, kwargs: dict, reraise: bool = False) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    return fn(*args, **kwargs)
+            return fn(*args, **kwargs)
+        except Exception:
+            if reraise:
+                raise
+            logger.exception("Background job %s failed", getattr(fn, '__name__', fn))
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = self._running
+        used = 0
+        if self._slots is not None:
+            used = self.max_workers + self.max_pending - self._slots._value
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'running': running,
+            'pending': max(used - running, 0)
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+generation_queue = JobQueue(
+    max_workers=int(os.getenv('GENERATION_WORKERS', '4')),
+    max_pending=int(os.getenv('GENERATION_QUEUE_SIZE', '100'))
+)
+
+# Items of /generate/batch, shared by every batch request so that
+# BATCH_CONCURRENCY caps the generations of all batches together
+batch_queue = JobQueue(
+    max_workers=int(os.getenv('BATCH_CONCURRENCY', '4')),
+    max_pending=int(os.getenv('BATCH_QUEUE_SIZE', '100')),
+    name='batch-worker'
+)
@@ -0,0 +1,224 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from flask import g, has_request_context, request
+
+# Field names whose values never reach the logs
+SENSITIVE_KEYS = {
+    'password', 'new_password', 'current_password', 'password_hash',
+    'token', 'access_token', 'refresh_token', 'authorization', 'cookie',
+    'jwt_secret_key', 'secret', 'api_key',
+}
+REDACTED = '[REDACTED]'
+# "password": "...", password=..., Authorization: Bearer ... inside free text
+_SENSITIVE_TEXT_RE = re.compile(
+    r'''(?i)(["']?(?:%s)["']?\s*[:=]\s*)(?:"[^"]*"|'[^']*'|Bearer\s+\S+|[^\s,;}]+)'''
+    % '|'.join(sorted(SENSITIVE_KEYS, key=len, reverse=True))
+)
+
+# Attributes every LogRecord has; anything else was passed with ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# One queue, output handler and listener per process, whatever the number
+# of apps created; configure_logging only changes their settings
+_log_queue: 'queue.Queue[logging.LogRecord]' = queue.Queue(-1)
+_output = logging.StreamHandler(sys.stdout)
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+_log_payloads = os.getenv('LOG_PAYLOADS', 'false').lower() == 'true'
+
+
+def redact(value: Any) -> Any:
+    """Copy of ``value`` with sensitive fields masked, recursively."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower().replace('-', '_') in SENSITIVE_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return _SENSITIVE_TEXT_RE.sub(lambda m: m.group(1) + REDACTED, value)
+    return value
+
+
+def current_request_id() -> Optional[str]:
+    if has_request_context():
+        return getattr(g, 'request_id', None)
+    return None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the id of the request being served.
+
+    Runs in the logging thread's caller, where the request context exists.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with redacted message and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = REDACTED if key.lower() in SENSITIVE_KEYS else redact(value)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, redacted the same way."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        record = copy.copy(record)
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        return super().format(record)
+
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener's formatter.
+
+    The stock ``prepare`` renders the record with a default formatter in the
+    calling thread; this only resolves the message arguments and the
+    traceback, which may reference objects that change after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        _ensure_listener()
+        super().enqueue(record)
+
+
+def _ensure_listener() -> None:
+    """Start the listener thread with the first record, not when an app is created."""
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_log_queue, _output, respect_handler_level=True)
+            _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out the queued records and stop the listener thread.
+
+    Called at exit; tests that build apps can call it in their teardown.
+    The next record starts a new listener.
+    """
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+atexit.register(stop_logging)
+
+
+def parse_levels(value: Optional[str]) -> Dict[str, str]:
+    """Parse LOG_LEVELS, e.g. "services.ai_service=DEBUG,werkzeug=WARNING"."""
+    levels = {}
+    for item in (value or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(app) -> None:
+    """Route every logger through a non-blocking queue to stdout.
+
+    Request threads only enqueue records; a single listener thread, started
+    by the first record, formats and writes them. Levels come from LOG_LEVEL
+    and the per-logger LOG_LEVELS; LOG_FORMAT is ``json`` (default) or
+    ``text``. Calling it again, for another app, only updates the settings.
+    """
+    global _log_payloads
+
+    _output.setFormatter(TextFormatter() if app.config.get('LOG_FORMAT') == 'text' else JsonFormatter())
+
+    root = logging.getLogger()
+    if not any(isinstance(existing, _QueueHandler) for existing in root.handlers):
+        queue_handler = _QueueHandler(_log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        root.addHandler(queue_handler)
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    for name, level in app.config.get('LOG_LEVELS', {}).items():
+        logging.getLogger(name).setLevel(level)
+    _log_payloads = bool(app.config.get('LOG_PAYLOADS', _log_payloads))
+
+    # Flask's own handler would print every app.logger record a second time
+    from flask.logging import default_handler
+    app.logger.removeHandler(default_handler)
+
+    if 'request_id_logging' not in app.extensions:
+        app.before_request(_assign_request_id)
+        app.after_request(_add_request_id_header)
+        app.extensions['request_id_logging'] = True
+
+
+def _assign_request_id() -> None:
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+
+def _add_request_id_header(response):
+    request_id = getattr(g, 'request_id', None)
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+def payloads_enabled() -> bool:
+    """Whether payload-sized debug output (prompts, LLM responses) is wanted."""
+    return _log_payloads
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any, **fields: Any) -> None:
+    """Log a prompt, request body or LLM response at DEBUG, only if LOG_PAYLOADS is set."""
+    if payloads_enabled() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra=dict(fields, payload=payload))
@@ -0,0 +1,257 @@
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Small in-process metrics registry rendered in the Prometheus text format
+# (https://prometheus.io/docs/instrumenting/exposition_formats/). Values are
+# per process: with several workers, scrape each one or aggregate upstream.
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [('', _format_labels(self.labelnames, key), value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                    samples.append(('_bucket', labels, cumulative))
+                labels = _format_labels(self.labelnames, key)
+                samples.append(('_sum', labels, total))
+                samples.append(('_count', labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = MetricsRegistry()
+
+LLM_REQUEST_SECONDS = registry.histogram(
+    'llm_request_duration_seconds', 'Wall time of Ollama generate calls.', ('model', 'outcome'))
+LLM_TOTAL_SECONDS = registry.histogram(
+    'llm_total_duration_seconds', 'Generation time reported by Ollama (total_duration).', ('model',))
+LLM_LOAD_SECONDS = registry.histogram(
+    'llm_load_duration_seconds', 'Model load time reported by Ollama (load_duration).', ('model',),
+    buckets=LOAD_BUCKETS)
+LLM_PROMPT_EVAL_SECONDS = registry.histogram(
+    'llm_prompt_eval_duration_seconds', 'Prompt evaluation time reported by Ollama.', ('model',),
+    buckets=LOAD_BUCKETS)
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    'llm_generation_tokens_per_second', 'Output token rate (eval_count / eval_duration).', ('model',),
+    buckets=TOKEN_RATE_BUCKETS)
+LLM_PROMPT_TOKENS = registry.counter(
+    'llm_prompt_tokens_total', 'Prompt tokens evaluated by Ollama.', ('model',))
+LLM_COMPLETION_TOKENS = registry.counter(
+    'llm_completion_tokens_total', 'Tokens generated by Ollama.', ('model',))
+LLM_RETRIES = registry.counter(
+    'llm_retries_total', 'LLM call retries, by whether the retry budget allowed them.', ('model', 'allowed'))
+LLM_FAILURES = registry.counter(
+    'llm_failures_total', 'LLM calls that failed for good, by error type.', ('model', 'error'))
+LLM_IN_FLIGHT = registry.gauge(
+    'llm_in_flight_requests', 'Generations currently running, per Ollama backend.', ('backend',))
+DB_QUERY_SECONDS = registry.histogram(
+    'db_query_duration_seconds', 'SQL statement execution time.', ('operation',), buckets=DB_BUCKETS)
+
+_NS = 1e9
+
+
+def record_ollama_timings(model: str, result: Dict[str, Any]) -> None:
+    """Record the timing and token fields of a finished /api/generate response."""
+    if result.get('total_duration'):
+        LLM_TOTAL_SECONDS.observe(result['total_duration'] / _NS, model=model)
+    if 'load_duration' in result:
+        LLM_LOAD_SECONDS.observe(result['load_duration'] / _NS, model=model)
+    if 'prompt_eval_duration' in result:
+        LLM_PROMPT_EVAL_SECONDS.observe(result['prompt_eval_duration'] / _NS, model=model)
+    if result.get('prompt_eval_count'):
+        LLM_PROMPT_TOKENS.inc(result['prompt_eval_count'], model=model)
+    eval_count = result.get('eval_count')
+    if eval_count:
+        LLM_COMPLETION_TOKENS.inc(eval_count, model=model)
+        if result.get('eval_duration'):
+            LLM_TOKENS_PER_SECOND.observe(eval_count / (result['eval_duration'] / _NS), model=model)
+
+
+_SQL_OPERATIONS = {'select', 'insert', 'update', 'delete'}
+_instrumented = False
+
+
+# The start time lives on the statement's execution context: a statement that
+# raises never reaches after_cursor_execute, and its context is simply dropped
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].lower() if words else ''
+    DB_QUERY_SECONDS.observe(time.perf_counter() - started,
+                             operation=operation if operation in _SQL_OPERATIONS else 'other')
+
+
+def instrument_sqlalchemy() -> None:
+    """Time every SQL statement of every engine (primary and replica)."""
+    global _instrumented
+    if _instrumented:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _instrumented = True
+
+
+def init_app(app) -> None:
+    if app.config.get('METRICS_ENABLED', True):
+        instrument_sqlalchemy()
+    app.extensions['metrics'] = registry
+
+
+class LLMCallTimer:
+    """Context manager recording the wall time and outcome of one LLM call."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.start: Optional[float] = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - self.start, model=self.model,
+                                    outcome='error' if exc_type else 'success')
+        return False
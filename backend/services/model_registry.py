@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (preferred, fallback) pairs already logged, so a missing model warns once
+_warned_fallback = set()
+
+
+def select_model(preferred: str, models: List[Dict[str, Any]]) -> str:
+    """Return ``preferred`` if it is in ``models``, otherwise the first of them."""
+    if not models:
+        raise Exception("No models available. Please install a model first.")
+
+    if preferred in [m.get('name', '') for m in models]:
+        return preferred
+
+    fallback = models[0].get('name', 'mistral:latest')
+    if (preferred, fallback) not in _warned_fallback:
+        _warned_fallback.add((preferred, fallback))
+        logger.warning("%s not found, using %s instead", preferred, fallback)
+    return fallback
+
+
+class ModelRegistry:
+    """Cache of the models installed on one Ollama host.
+
+    The list returned by ``/api/tags`` only changes when someone pulls or
+    removes a model, so it is cached for ``ttl`` seconds instead of being
+    fetched before every prompt. The backend pool's health probes keep it
+    fresh through ``update``, and the last successful list is kept as a
+    fallback when Ollama cannot be reached.
+    """
+
+    def __init__(self, fetch_models: Callable[[], List[Dict[str, Any]]], ttl: float = 60.0):
+        self._fetch_models = fetch_models
+        self.ttl = ttl
+        self._models: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._models is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Fetch the model list now, falling back to the last known-good list."""
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> List[Dict[str, Any]]:
+        try:
+            models = self._fetch_models()
+        except Exception as e:
+            if self._models is None:
+                raise
+            logger.warning("Failed to refresh Ollama models, using last known list: %s", e)
+            return self._models
+        self._models = models
+        self._fetched_at = time.monotonic()
+        return models
+
+    def update(self, models: List[Dict[str, Any]]) -> None:
+        """Store a model list fetched elsewhere (e.g. by a health probe)."""
+        with self._lock:
+            self._models = models
+            self._fetched_at = time.monotonic()
+
+    def get_models(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """Return the installed models, hitting Ollama only when the cache expired."""
+        if not force_refresh and self._is_fresh():
+            return self._models
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not force_refresh and self._is_fresh():
+                return self._models
+            return self._refresh_locked()
+
+    def get_model_names(self, force_refresh: bool = False) -> List[str]:
+        return [m.get('name', '') for m in self.get_models(force_refresh)]
+
+    def resolve_model(self, preferred: str) -> str:
+        """Return ``preferred`` if installed, otherwise the first available model."""
+        return select_model(preferred, self.get_models())
+
+    def invalidate(self) -> None:
+        """Expire the cached list so the next lookup fetches it again.
+
+        The last known-good list is kept so it can still serve as a fallback.
+        """
+        with self._lock:
+            self._fetched_at = 0.0
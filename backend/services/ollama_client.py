@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class OllamaClient:
+    """HTTP client for the Ollama API backed by a pooled keep-alive session.
+
+    A single instance is created per process (see ``extensions.ollama``) and
+    configured in ``create_app`` through ``init_app``, so every generation
+    reuses the same TCP connections instead of opening one per request.
+    Every call accepts a ``base_url`` so one session (with one connection
+    pool per host) serves all the backends of ``BackendPool``.
+    Timeouts are ``(connect, read)`` tuples chosen per endpoint: listing
+    models is quick, while a generation may legitimately take minutes.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, pool_size: int = 10,
+                 connect_timeout: float = 3.05, tags_timeout: float = 10,
+                 generate_timeout: float = 120):
+        self.base_url = (base_url or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/')
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeouts = {
+            'tags': tags_timeout,
+            'generate': generate_timeout,
+        }
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        """Configure the client from the Flask app config."""
+        self.base_url = app.config.get('OLLAMA_BASE_URL', self.base_url).rstrip('/')
+        self.pool_size = int(app.config.get('OLLAMA_POOL_SIZE', self.pool_size))
+        self.connect_timeout = float(app.config.get('OLLAMA_CONNECT_TIMEOUT', self.connect_timeout))
+        self.read_timeouts['tags'] = float(app.config.get('OLLAMA_TAGS_TIMEOUT', self.read_timeouts['tags']))
+        self.read_timeouts['generate'] = float(
+            app.config.get('OLLAMA_GENERATE_TIMEOUT', self.read_timeouts['generate'])
+        )
+        # Drop any session built with the previous settings
+        self.close()
+        app.extensions['ollama_client'] = self
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def timeout(self, endpoint: str) -> Tuple[float, float]:
+        """Return the ``(connect, read)`` timeout used for an endpoint."""
+        return (self.connect_timeout, self.read_timeouts.get(endpoint, self.read_timeouts['generate']))
+
+    def url(self, path: str, base_url: Optional[str] = None) -> str:
+        return f"{(base_url or self.base_url).rstrip('/')}/api/{path}"
+
+    def get(self, endpoint: str, timeout: Optional[Timeout] = None,
+            base_url: Optional[str] = None) -> requests.Response:
+        return self.session.get(self.url(endpoint, base_url), timeout=timeout or self.timeout(endpoint))
+
+    def post(self, endpoint: str, payload: Dict[str, Any], timeout: Optional[Timeout] = None,
+             stream: bool = False, base_url: Optional[str] = None) -> requests.Response:
+        return self.session.post(
+            self.url(endpoint, base_url),
+            json=payload,
+            timeout=timeout or self.timeout(endpoint),
+            stream=stream
+        )
+
+    def tags(self, base_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the models installed on the Ollama host."""
+        response = self.get('tags', base_url=base_url)
+        response.raise_for_status()
+        return response.json().get('models', [])
+
+    def generate(self, model: str, prompt: str, timeout: Optional[Timeout] = None,
+                 base_url: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        """Run a non-streaming generation and return Ollama's JSON response."""
+        payload = {'model': model, 'prompt': prompt, 'stream': False}
+        payload.update(fields)
+        response = self.post('generate', payload, timeout=timeout, base_url=base_url)
+        response.raise_for_status()
+        return response.json()
+
+    def generate_stream(self, model: str, prompt: str, timeout: Optional[Timeout] = None,
+                        base_url: Optional[str] = None, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Run a streaming generation and yield each NDJSON chunk from Ollama.
+
+        The read timeout applies between chunks rather than to the whole
+        generation, so long answers keep streaming as long as tokens arrive.
+        """
+        payload = {'model': model, 'prompt': prompt, 'stream': True}
+        payload.update(fields)
+        with self.post('generate', payload, timeout=timeout, stream=True, base_url=base_url) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise Exception(f"Ollama error: {chunk['error']}")
+                yield chunk
+                if chunk.get('done'):
+                    break
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,151 @@
+import hmac
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterable, List, Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+# werkzeug method strings: "scrypt:N:r:p" or "pbkdf2:<hash>:<iterations>"
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+# "<method>$<salt>$<hex digest>", as produced by generate_password_hash
+_WERKZEUG_HASH_RE = re.compile(r'^(?:pbkdf2|scrypt)(?::[\w-]+)*\$[^$]+\$[0-9a-f]+$')
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when more hashes are waiting than the pool accepts."""
+
+
+def is_hashed(stored: Optional[str]) -> bool:
+    """Whether ``stored`` is a werkzeug hash rather than a legacy plain-text password."""
+    return bool(stored) and _WERKZEUG_HASH_RE.match(stored) is not None
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a small bounded thread pool.
+
+    Key derivation is deliberately CPU-heavy. Running it on at most
+    ``max_workers`` threads (hashlib releases the GIL while deriving) caps
+    how many cores logins can take from the rest of the app; callers
+    beyond ``max_pending`` waiting hashes get PasswordHasherBusy instead
+    of queuing without limit. The method sets the algorithm and cost, e.g.
+    ``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``.
+    """
+
+    def __init__(self, method: str = DEFAULT_METHOD, max_workers: int = 2, max_pending: int = 64,
+                 timeout: float = 10.0):
+        self.method = method
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+        self._prefix: Optional[str] = None
+
+    def init_app(self, app) -> None:
+        self.configure(
+            method=app.config.get('PASSWORD_HASH_METHOD', self.method),
+            max_workers=int(app.config.get('PASSWORD_HASH_WORKERS', self.max_workers)),
+            max_pending=int(app.config.get('PASSWORD_HASH_QUEUE_SIZE', self.max_pending)),
+            timeout=float(app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout))
+        )
+        app.extensions['password_hasher'] = self
+
+    def configure(self, method: Optional[str] = None, max_workers: Optional[int] = None,
+                  max_pending: Optional[int] = None, timeout: Optional[float] = None) -> None:
+        """Change the settings; the pool is rebuilt on next use."""
+        self.shutdown()
+        with self._lock:
+            if method is not None:
+                self.method = method
+                self._prefix = None
+            if max_workers is not None:
+                self.max_workers = max_workers
+            if max_pending is not None:
+                self.max_pending = max_pending
+            if timeout is not None:
+                self.timeout = timeout
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='password-hasher'
+                    )
+        return self._executor
+
+    def _submit(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Future:
+        executor = self._ensure_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=wait, timeout=self.timeout if wait else None):
+            raise PasswordHasherBusy('Too many password checks in progress, try again later')
+        future = executor.submit(fn, *args)
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def _result(self, future: Future) -> Any:
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The hash keeps its worker until done; callers get the same
+            # "try again later" as when the queue is full
+            raise PasswordHasherBusy('Password check timed out, try again later') from None
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return self._result(self._submit(fn, *args))
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """Hash in batches of ``max_workers``, so bulk work queues behind logins
+        instead of ahead of them."""
+        passwords = list(passwords)
+        hashes: List[str] = []
+        for start in range(0, len(passwords), self.max_workers):
+            futures = [self._submit(generate_password_hash, password, self.method, wait=True)
+                       for password in passwords[start:start + self.max_workers]]
+            hashes.extend(self._result(future) for future in futures)
+        return hashes
+
+    def verify(self, stored: Optional[str], password: str) -> bool:
+        """Check ``password`` against a werkzeug hash or a legacy plain-text value."""
+        if not stored or password is None:
+            return False
+        if is_hashed(stored):
+            return self._run(check_password_hash, stored, password)
+        # Rows written before passwords were hashed
+        return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+
+    def current_prefix(self) -> str:
+        """Method part of a hash made now, with werkzeug's defaults filled in."""
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, stored: Optional[str]) -> bool:
+        """True for plain-text rows and hashes made with another method or cost."""
+        if not is_hashed(stored):
+            return True
+        return stored.split('$', 1)[0] != self.current_prefix()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+                self._slots = None
+
+
+password_hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+    max_workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+    max_pending=int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', '64'))
+)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Generation options each template may set (see Ollama's Modelfile parameters)
+OPTION_TYPES = {'num_predict': int, 'num_ctx': int, 'temperature': float, 'top_p': float, 'top_k': int}
+# Longest subject or grade substituted into a prompt (Request.topic is 200 characters)
+MAX_VALUE_CHARS = 200
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Strip indentation and trailing spaces, collapse runs of spaces and blank lines.
+
+    Source templates are indented like the code around them; the model only
+    needs the line structure, and every space costs prompt evaluation.
+    """
+    lines = [' '.join(line.split()) for line in text.strip().splitlines()]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per punctuation mark, one per ~4 characters of a word.
+
+    Close enough to BPE tokenizers on English prompts to budget num_ctx; the
+    exact count is Ollama's prompt_eval_count, exported in the metrics.
+    """
+    return sum(math.ceil(len(token) / 4) if token[0].isalnum() or token[0] == '_' else 1
+               for token in _TOKEN_RE.findall(text))
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A named, versioned prompt with the generation options it runs with.
+
+    ``version_id`` ("qcm-v2.1a2b3c4d") also hashes the compiled text and the
+    options, so changing either, even through PROMPT_OPTIONS, never reuses
+    cached generations and shows up on the stored contents.
+    """
+
+    name: str
+    version: int
+    text: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    version_id: str = ''
+    token_estimate: int = 0
+
+    @classmethod
+    def compile(cls, name: str, version: int, source: str, options: Dict[str, Any]) -> 'PromptTemplate':
+        text = normalize_whitespace(source)
+        fingerprint = hashlib.sha256(
+            json.dumps([text, options], sort_keys=True).encode('utf-8')
+        ).hexdigest()[:8]
+        return cls(name=name, version=version, text=text, options=dict(options),
+                   version_id=f"{name}-v{version}.{fingerprint}",
+                   token_estimate=estimate_tokens(re.sub(r'\{\w+\}', '', text)))
+
+    def render(self, **values: Any) -> str:
+        """Fill the template; values are whitespace-normalized and capped at MAX_VALUE_CHARS."""
+        prompt = self.text.format(**{
+            key: ' '.join(str(value).split())[:MAX_VALUE_CHARS] for key, value in values.items()
+        })
+        num_ctx, num_predict = self.options.get('num_ctx'), self.options.get('num_predict')
+        if num_ctx and num_predict:
+            estimate = estimate_tokens(prompt)
+            if estimate + num_predict > num_ctx:
+                logger.warning("Prompt %s may not fit its context window", self.version_id, extra={
+                    'prompt_tokens': estimate, 'num_predict': num_predict, 'num_ctx': num_ctx
+                })
+        return prompt
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'version_id': self.version_id,
+            'token_estimate': self.token_estimate,
+            'options': dict(self.options)
+        }
+
+
+def parse_options(value: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Parse PROMPT_OPTIONS, e.g. "qcm.num_predict=300,summary.temperature=0.3"."""
+    overrides: Dict[str, Dict[str, Any]] = {}
+    for item in (value or '').split(','):
+        key, _, raw = item.partition('=')
+        name, _, option = key.strip().partition('.')
+        if not (name and option and raw.strip()):
+            continue
+        if option not in OPTION_TYPES:
+            logger.warning("Ignoring unknown prompt option %s", key.strip())
+            continue
+        overrides.setdefault(name, {})[option] = OPTION_TYPES[option](raw.strip())
+    return overrides
+
+
+class PromptRegistry:
+    """Prompt templates by name, compiled once at registration."""
+
+    def __init__(self, overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.overrides = overrides or {}
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, version: int, source: str, **options: Any) -> PromptTemplate:
+        unknown = set(options) - set(OPTION_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown generation option(s): {', '.join(sorted(unknown))}")
+        template = PromptTemplate.compile(name, version, source, dict(options, **self.overrides.get(name, {})))
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise ValueError(f"Unknown prompt template: {name}") from None
+
+    def describe(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [template.describe() for template in self._templates.values()]
+
+
+prompts = PromptRegistry(overrides=parse_options(os.getenv('PROMPT_OPTIONS')))
+
+# Single question in the QUESTION/OPTIONS/... text format read by qcm_parser
+QCM_PROMPT = prompts.register('qcm', 2, """
+    You are an expert teacher creating educational content. Create a multiple-choice question about {subject} for {grade} level students.
+
+    Follow this format exactly:
+    QUESTION: [Write a clear, engaging question]
+    OPTIONS:
+    1. [First option]
+    2. [Second option]
+    3. [Third option]
+    4. [Fourth option]
+    CORRECT_ANSWER: [Number 1-4]
+    EXPLANATION: [Brief explanation of why this is correct]
+
+    Guidelines:
+    - Make the question clear and appropriate for {grade} level
+    - Include exactly 4 options
+    - Make one option clearly correct
+    - Make other options plausible but incorrect
+    - Keep the explanation simple and educational
+    """, num_predict=400, num_ctx=2048, temperature=0.7)
+
+# The JSON templates keep a compact example: the schema passed as Ollama's
+# format already constrains the structure
+QUIZ_PROMPT = prompts.register('quiz', 3, """
+    You are an educational content generator. Generate a 5-question multiple choice quiz about "{topic}" for {level} level.
+    Return ONLY a valid JSON object in this exact format, with no additional text:
+    {{"questions": [{{"question": "Question text", "options": ["Option 1", "Option 2", "Option 3", "Option 4"], "correct_answer": 0, "explanation": "Explanation of the correct answer"}}]}}
+
+    Important:
+    - Each question MUST have exactly 4 options
+    - The correct_answer must be an index (0-3) corresponding to the correct option
+    - Do not include any text before or after the JSON object
+    - Make sure the JSON is properly formatted with double quotes
+    """, num_predict=1500, num_ctx=4096, temperature=0.5)
+
+EXERCISE_PROMPT = prompts.register('exercise', 3, """
+    You are an educational content generator. Generate a practical exercise about "{topic}" for {level} level.
+    Return ONLY a valid JSON object in this exact format, with no additional text:
+    {{"title": "Exercise title", "description": "Exercise description", "steps": ["Step 1", "Step 2", ...], "solution": "Detailed solution", "hints": ["Hint 1", "Hint 2", ...]}}
+    """, num_predict=1000, num_ctx=2048, temperature=0.6)
+
+SUMMARY_PROMPT = prompts.register('summary', 3, """
+    You are an educational content generator. Generate a summary sheet about "{topic}" for {level} level.
+    Return ONLY a valid JSON object in this exact format, with no additional text:
+    {{"title": "Summary title", "key_points": ["Point 1", "Point 2", ...], "main_concepts": ["Concept 1", "Concept 2", ...], "examples": ["Example 1", "Example 2", ...], "conclusion": "Conclusion text"}}
+    """, num_predict=900, num_ctx=2048, temperature=0.5)
@@ -0,0 +1,203 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+SECTIONS = ('QUESTION', 'OPTIONS', 'CORRECT_ANSWER', 'EXPLANATION')
+
+# A section header at the start of a line: "QUESTION:", "**Question 1:**",
+# "Correct answer :", "**EXPLANATION:**", "## Options"... The colon is
+# optional when nothing follows the header on the same line.
+HEADER_RE = re.compile(
+    r'^[\s#*>_-]*(QUESTION|OPTIONS|CORRECT[_ ]ANSWER|EXPLANATION)(?:\s*#?\d+)?'
+    r'[\s*_]*(?::[\s*_]*(.*?)[\s*_]*|)$',
+    re.IGNORECASE
+)
+# "1. text", "2) text", "A. text", "b) text", optionally bulleted
+OPTION_RE = re.compile(r'^[\s*-]*(?:(\d+)|([A-Da-d]))[.)]\s+(.*)$')
+# Template placeholders the model sometimes copies verbatim
+PLACEHOLDER_RE = re.compile(r'\[(?:WRITE|NUMBER|YOUR|FIRST|SECOND|THIRD|FOURTH)', re.IGNORECASE)
+# "2", "B", "(B)", "2." or "B) text": a letter or number only counts as an
+# index when it stands alone or is followed by a delimiter, so an answer
+# such as "A cell wall" is not read as option A
+ANSWER_NUMBER_RE = re.compile(r'^\(?(?:([1-9])|([A-Da-d]))(?:[.):]|\s*$)')
+
+
+@dataclass(frozen=True)
+class ParsedQCM:
+    """A QCM parsed from the LLM's text response."""
+
+    question: str = ''
+    options: Tuple[str, ...] = ()
+    correct_answer: str = ''
+    answer_index: Optional[int] = None
+    explanation: str = ''
+    sections: Tuple[str, ...] = ()
+    has_placeholders: bool = False
+    diagnostics: Tuple[str, ...] = field(default=())
+
+    @property
+    def missing_sections(self) -> List[str]:
+        """Sections that are absent or empty."""
+        values = {
+            'QUESTION': self.question,
+            'OPTIONS': self.options,
+            'CORRECT_ANSWER': self.correct_answer,
+            'EXPLANATION': self.explanation,
+        }
+        return [name for name in SECTIONS if not values[name]]
+
+    def validate(self) -> None:
+        """Raise ValueError if the QCM cannot be shown to a student."""
+        missing = self.missing_sections
+        if missing:
+            raise ValueError(f"Response missing required sections: {', '.join(missing)}")
+        if self.has_placeholders:
+            raise ValueError("Response contains placeholder text instead of actual content")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'question': self.question,
+            'options': list(self.options),
+            'correct_answer': self.correct_answer,
+            'answer_index': self.answer_index,
+            'explanation': self.explanation
+        }
+
+
+class QCMParser:
+    """Single-pass, incremental QCM parser.
+
+    Lines are classified once against the compiled header, option and
+    placeholder patterns. ``feed`` accepts arbitrary chunks (e.g. streamed
+    tokens) and returns the sections completed by them, so the same parser
+    backs both streaming and whole-response parsing.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._current: Optional[str] = None
+        self._lines: List[str] = []
+        self._values: Dict[str, Any] = {}
+        self._placeholders = False
+        self._diagnostics: List[str] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Feed a chunk of text and return the sections it completed."""
+        self._buffer += text
+        finished = []
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            finished.extend(self.feed_line(line))
+        return finished
+
+    def feed_line(self, line: str) -> List[Dict[str, Any]]:
+        if not self._placeholders and PLACEHOLDER_RE.search(line):
+            self._placeholders = True
+        match = HEADER_RE.match(line)
+        if match is None:
+            if self._current is not None and line.strip():
+                self._lines.append(line.strip())
+            return []
+        finished = self._finish_current()
+        self._current = match.group(1).upper().replace(' ', '_')
+        rest = (match.group(2) or '').strip()
+        self._lines = [rest] if rest else []
+        return finished
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Flush the remaining text and return the last completed sections."""
+        finished = []
+        if self._buffer:
+            finished.extend(self.feed_line(self._buffer))
+            self._buffer = ''
+        finished.extend(self._finish_current())
+        return finished
+
+    def _finish_current(self) -> List[Dict[str, Any]]:
+        section = self._current
+        if section is None:
+            return []
+        if section == 'OPTIONS':
+            value = []
+            for line in self._lines:
+                option = OPTION_RE.match(line)
+                value.append(option.group(3).strip() if option else line)
+        else:
+            value = ' '.join(self._lines)
+        self._current = None
+        self._lines = []
+
+        if section in self._values:
+            self._diagnostics.append(f"duplicate {section} section ignored")
+        else:
+            self._values[section] = value
+        return [{'section': section.lower(), 'value': value}]
+
+    def result(self) -> ParsedQCM:
+        values = self._values
+        options = tuple(values.get('OPTIONS', ()))
+        correct_answer = values.get('CORRECT_ANSWER', '')
+        diagnostics = list(self._diagnostics)
+
+        answer_index = _answer_index(correct_answer, options)
+        if correct_answer and answer_index is None:
+            diagnostics.append(f"correct answer '{correct_answer}' does not match an option")
+        if options and len(options) != 4:
+            diagnostics.append(f"expected 4 options, got {len(options)}")
+        for name in SECTIONS:
+            if name not in values:
+                diagnostics.append(f"missing {name} section")
+        if self._placeholders:
+            diagnostics.append("placeholder text found")
+
+        return ParsedQCM(
+            question=values.get('QUESTION', ''),
+            options=options,
+            correct_answer=correct_answer,
+            answer_index=answer_index,
+            explanation=values.get('EXPLANATION', ''),
+            sections=tuple(name for name in SECTIONS if name in values),
+            has_placeholders=self._placeholders,
+            diagnostics=tuple(diagnostics)
+        )
+
+
+def _fold(text: str) -> str:
+    return ' '.join(text.split()).rstrip('.').casefold()
+
+
+def _answer_index(correct_answer: str, options: Tuple[str, ...]) -> Optional[int]:
+    """Map the option text itself, "2" or "B)" to a 0-based option index.
+
+    The option text is tried first: "A cell wall" is an answer, not option A.
+    """
+    if not correct_answer:
+        return None
+    folded = _fold(correct_answer)
+    for index, option in enumerate(options):
+        if _fold(option) == folded:
+            return index
+    match = ANSWER_NUMBER_RE.match(correct_answer.strip())
+    if match:
+        if match.group(1):
+            index = int(match.group(1)) - 1
+        else:
+            index = ord(match.group(2).upper()) - ord('A')
+        if index < len(options) or not options:
+            return index
+    return None
+
+
+@lru_cache(maxsize=256)
+def parse_qcm(text: str) -> ParsedQCM:
+    """Parse a full QCM response.
+
+    Results are memoized, so the validator and the route share one parse of
+    the same response.
+    """
+    parser = QCMParser()
+    for line in text.splitlines():
+        parser.feed_line(line)
+    parser.close()
+    return parser.result()
@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from typing import Any, Dict
+
+import requests
+
+# HTTP statuses worth retrying: overload and transient server failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMServiceError(Exception):
+    """The LLM call failed in a way retrying will not fix."""
+
+
+class RetryableLLMError(LLMServiceError):
+    """A transient LLM failure (transport error, overload, empty answer)."""
+
+
+class CircuitOpenError(LLMServiceError):
+    """Every Ollama backend is failing; the call was rejected without trying."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error raised on the LLM call path is worth another attempt."""
+    if isinstance(error, RetryableLLMError):
+        return True
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = getattr(error, 'response', None)
+        return response is not None and response.status_code in RETRYABLE_STATUSES
+    return False
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker for one Ollama backend.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds. It then lets up to
+    ``half_open_max_calls`` trial calls through: a success closes it again,
+    a failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Reserve the right to make a call; False while the circuit is open."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+    def release(self) -> None:
+        """Give back a slot reserved by ``allow`` when the call ended without an
+        outcome (a stream closed by the client), so a half-open circuit does
+        not wait forever for a probe that will never report."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'state': self._current_state(), 'consecutive_failures': self._failures}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped by a retry budget.
+
+    Every call deposits ``budget_ratio`` tokens (up to ``budget_max``) and
+    every retry spends one, so retries can add at most roughly
+    ``budget_ratio`` extra load on top of normal traffic. During an outage
+    the budget drains and callers fail after their first attempt instead of
+    multiplying the load on Ollama.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 budget_ratio: float = 0.2, budget_min: float = 10.0, budget_max: float = 100.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self._tokens = budget_min
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.retries_denied = 0
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._tokens = min(self.budget_max, self._tokens + self.budget_ratio)
+
+    def try_acquire_retry(self) -> bool:
+        """Spend a token from the retry budget; False when it is exhausted."""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.retries_denied += 1
+            return False
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'budget_tokens': round(self._tokens, 2),
+                'retries': self.retries,
+                'retries_denied': self.retries_denied
+            }
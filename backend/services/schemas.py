@@ -0,0 +1,236 @@
+import json
+import threading
+from typing import Any, Callable, Dict, List
+
+from services.resilience import LLMServiceError
+
+# JSON schemas passed to Ollama's ``format`` parameter so the model can only
+# produce output of the expected shape, and reused to validate the result.
+QUIZ_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'questions': {
+            'type': 'array',
+            'minItems': 1,
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'question': {'type': 'string', 'minLength': 1},
+                    'options': {
+                        'type': 'array',
+                        'items': {'type': 'string'},
+                        'minItems': 4,
+                        'maxItems': 4
+                    },
+                    'correct_answer': {'type': 'integer', 'minimum': 0, 'maximum': 3},
+                    'explanation': {'type': 'string'}
+                },
+                'required': ['question', 'options', 'correct_answer', 'explanation']
+            }
+        }
+    },
+    'required': ['questions']
+}
+
+EXERCISE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': {'type': 'string', 'minLength': 1},
+        'description': {'type': 'string'},
+        'steps': {'type': 'array', 'items': {'type': 'string'}},
+        'solution': {'type': 'string'},
+        'hints': {'type': 'array', 'items': {'type': 'string'}}
+    },
+    'required': ['title', 'description', 'steps', 'solution', 'hints']
+}
+
+SUMMARY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': {'type': 'string', 'minLength': 1},
+        'key_points': {'type': 'array', 'items': {'type': 'string'}},
+        'main_concepts': {'type': 'array', 'items': {'type': 'string'}},
+        'examples': {'type': 'array', 'items': {'type': 'string'}},
+        'conclusion': {'type': 'string'}
+    },
+    'required': ['title', 'key_points', 'main_concepts', 'examples', 'conclusion']
+}
+
+Validator = Callable[[Any, str], List[str]]
+
+_TYPES = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Compile the subset of JSON Schema used above into a validator.
+
+    The schema is walked once here; the returned function only runs the
+    checks it needs and returns a list of error messages (empty when valid).
+    """
+    checks: List[Validator] = []
+
+    expected = schema.get('type')
+    if expected:
+        type_check = _TYPES[expected]
+
+        def check_type(value, path):
+            return [] if type_check(value) else [f"{path} must be of type {expected}"]
+        checks.append(check_type)
+
+    if 'minimum' in schema or 'maximum' in schema:
+        low, high = schema.get('minimum'), schema.get('maximum')
+
+        def check_range(value, path):
+            if not _TYPES['number'](value):
+                return []
+            if (low is not None and value < low) or (high is not None and value > high):
+                return [f"{path} must be between {low} and {high}"]
+            return []
+        checks.append(check_range)
+
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+
+        def check_length(value, path):
+            if isinstance(value, str) and len(value.strip()) < min_length:
+                return [f"{path} must not be empty"]
+            return []
+        checks.append(check_length)
+
+    if 'minItems' in schema or 'maxItems' in schema:
+        min_items, max_items = schema.get('minItems', 0), schema.get('maxItems')
+
+        def check_items_count(value, path):
+            if not isinstance(value, list):
+                return []
+            if len(value) < min_items or (max_items is not None and len(value) > max_items):
+                if min_items == max_items:
+                    return [f"{path} must have exactly {min_items} items"]
+                return [f"{path} must have between {min_items} and {max_items or 'any'} items"]
+            return []
+        checks.append(check_items_count)
+
+    required = schema.get('required', [])
+    if required:
+        def check_required(value, path):
+            if not isinstance(value, dict):
+                return []
+            return [f"{path} missing '{name}' field" for name in required if name not in value]
+        checks.append(check_required)
+
+    properties = {name: compile_schema(sub) for name, sub in schema.get('properties', {}).items()}
+    if properties:
+        def check_properties(value, path):
+            if not isinstance(value, dict):
+                return []
+            errors = []
+            for name, validate in properties.items():
+                if name in value:
+                    errors.extend(validate(value[name], f"{path}.{name}"))
+            return errors
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        validate_item = compile_schema(schema['items'])
+
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return []
+            errors = []
+            for index, item in enumerate(value):
+                errors.extend(validate_item(item, f"{path}[{index}]"))
+            return errors
+        checks.append(check_items)
+
+    def validate(value, path='$'):
+        errors = []
+        for check in checks:
+            errors.extend(check(value, path))
+        return errors
+    return validate
+
+
+SCHEMAS = {
+    'quiz': QUIZ_SCHEMA,
+    'exercise': EXERCISE_SCHEMA,
+    'summary': SUMMARY_SCHEMA,
+}
+
+# Compiled once at import time
+VALIDATORS = {kind: compile_schema(schema) for kind, schema in SCHEMAS.items()}
+
+
+class StructuredOutputError(LLMServiceError):
+    """The model output could not be parsed or did not match its schema."""
+
+
+class StructuredOutputStats:
+    """Per content type counts of structured generations and their failures."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(kind, {'total': 0, 'parse_failures': 0, 'validation_failures': 0})
+            counts['total'] += 1
+            if outcome != 'ok':
+                counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for kind, counts in self._counts.items():
+                total = counts['total']
+                result[kind] = dict(
+                    counts,
+                    parse_failure_rate=counts['parse_failures'] / total if total else 0.0,
+                    validation_failure_rate=counts['validation_failures'] / total if total else 0.0
+                )
+            return result
+
+
+structured_output_stats = StructuredOutputStats()
+
+
+def _extract_json_object(text: str) -> Any:
+    """Decode the first JSON object in text that may be wrapped in prose."""
+    start = text.find('{')
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    result, _ = json.JSONDecoder().raw_decode(text, start)
+    return result
+
+
+def parse_structured(kind: str, text: str, lenient: bool = False) -> Dict[str, Any]:
+    """Parse and validate a structured generation of the given kind.
+
+    With ``lenient`` (used when the model was not schema-constrained) a JSON
+    object surrounded by stray text is still accepted.
+    """
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError as e:
+        try:
+            if not lenient:
+                raise
+            result = _extract_json_object(text)
+        except json.JSONDecodeError:
+            structured_output_stats.record(kind, 'parse_failures')
+            raise StructuredOutputError(f"Failed to parse {kind} response as JSON: {e}")
+
+    errors = VALIDATORS[kind](result)
+    if errors:
+        structured_output_stats.record(kind, 'validation_failures')
+        raise StructuredOutputError(f"Invalid {kind} response: {'; '.join(errors[:5])}")
+
+    structured_output_stats.record(kind, 'ok')
+    return result
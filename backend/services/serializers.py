@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import defer, selectinload
+
+from extensions import db
+from models.models import Content, Request, User, utc_isoformat
+
+# Listing endpoints serialize through these views instead of the models'
+# to_dict(), which walk lazy relationships and issue one query per row.
+# "shallow" is the row itself without large or related data; "deep" adds
+# the related rows (themselves shallow), loaded in one extra query each.
+SHALLOW = 'shallow'
+DEEP = 'deep'
+VIEWS = (SHALLOW, DEEP)
+
+# Heavy columns left out of shallow contents
+CONTENT_BODY_COLUMNS = (Content.content_data, Content.structured_data)
+
+
+def serialize_content(content: Content, view: str = SHALLOW) -> Dict[str, Any]:
+    result = {
+        'id': content.id,
+        'request_id': content.request_id,
+        'user_id': content.user_id,
+        'title': content.title,
+        'content_type': content.content_type,
+        'prompt_version': content.prompt_version,
+        'created_at': utc_isoformat(content.created_at),
+        'updated_at': utc_isoformat(content.updated_at)
+    }
+    if view == DEEP:
+        result['content_data'] = content.content_data
+        result['structured_data'] = content.structured_data
+    return result
+
+
+def serialize_request(request_obj: Request, view: str = SHALLOW) -> Dict[str, Any]:
+    result = {
+        'id': request_obj.id,
+        'user_id': request_obj.user_id,
+        'topic': request_obj.topic,
+        'level': request_obj.level,
+        'date_created': utc_isoformat(request_obj.date_created),
+        'job_id': request_obj.job_id,
+        'status': request_obj.status,
+        'started_at': utc_isoformat(request_obj.started_at),
+        'finished_at': utc_isoformat(request_obj.finished_at),
+        'error': request_obj.error
+    }
+    if view == DEEP:
+        result['contents'] = [serialize_content(c) for c in request_obj.contents]
+    return result
+
+
+def serialize_user(user: User, view: str = SHALLOW) -> Dict[str, Any]:
+    result = {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'created_at': utc_isoformat(user.created_at)
+    }
+    if view == DEEP:
+        result['requests'] = [serialize_request(r) for r in user.requests]
+        result['contents'] = [serialize_content(c) for c in user.contents]
+    return result
+
+
+def content_options(view: str = SHALLOW) -> List[Any]:
+    """Loader options matching what ``serialize_content`` reads for a view."""
+    if view == DEEP:
+        return []
+    return [defer(column) for column in CONTENT_BODY_COLUMNS]
+
+
+def _shallow_contents(relationship):
+    return selectinload(relationship).options(*content_options(SHALLOW))
+
+
+def request_options(view: str = SHALLOW) -> List[Any]:
+    if view == DEEP:
+        return [_shallow_contents(Request.contents)]
+    return []
+
+
+def user_options(view: str = SHALLOW) -> List[Any]:
+    if view == DEEP:
+        return [selectinload(User.requests), _shallow_contents(User.contents)]
+    return []
+
+
+def list_requests(user_id: int, view: str = SHALLOW, limit: int = 20,
+                  before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """A user's requests, newest first, in a constant number of queries."""
+    query = (
+        db.select(Request)
+        .where(Request.user_id == user_id)
+        .options(*request_options(view))
+        .order_by(Request.id.desc())
+        .limit(limit)
+    )
+    if before_id is not None:
+        query = query.where(Request.id < before_id)
+    return [serialize_request(r, view) for r in db.session.scalars(query)]
+
+
+def list_users(view: str = SHALLOW) -> List[Dict[str, Any]]:
+    query = db.select(User).options(*user_options(view)).order_by(User.id)
+    return [serialize_user(u, view) for u in db.session.scalars(query)]
@@ -0,0 +1,76 @@
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import update
+
+from extensions import db
+from models.models import Content
+from services.qcm_parser import parse_qcm
+
+logger = logging.getLogger(__name__)
+
+
+def build_structured_data(content_type: str, generated: Any) -> Optional[Dict[str, Any]]:
+    """Structured form of a generation, as stored in ``Content.structured_data``.
+
+    QCMs are parsed from the LLM text; exercises and summaries are already
+    JSON, either as a dict or as the serialized ``content_data``. Returns
+    None when nothing usable is found, e.g. a QCM with no question or no
+    options.
+    """
+    if isinstance(generated, dict):
+        return generated
+    if content_type == 'qcm':
+        parsed = parse_qcm(generated or '')
+        if not parsed.question or not parsed.options:
+            return None
+        return parsed.to_dict()
+    try:
+        data = json.loads(generated)
+    except (TypeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def get_structured_data(content_obj: Content) -> Optional[Dict[str, Any]]:
+    """Stored structured data, parsing the raw text only for rows not backfilled yet."""
+    if content_obj.structured_data is not None:
+        return content_obj.structured_data
+    return build_structured_data(content_obj.content_type, content_obj.content_data)
+
+
+def backfill_structured_data(batch_size: int = 500) -> Dict[str, int]:
+    """Fill ``structured_data`` for existing rows, one batch per transaction.
+
+    Rows are walked by primary key so each batch is an index range scan, and
+    every batch is written with a single executemany UPDATE.
+    """
+    stats = {'updated': 0, 'unparseable': 0, 'batches': 0}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Content.id, Content.content_type, Content.content_data)
+            .where(Content.id > last_id, Content.structured_data.is_(None))
+            .order_by(Content.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            data = build_structured_data(row.content_type, row.content_data)
+            if data is None:
+                stats['unparseable'] += 1
+                continue
+            updates.append({'id': row.id, 'structured_data': data})
+
+        if updates:
+            db.session.execute(update(Content), updates)
+        db.session.commit()
+        stats['updated'] += len(updates)
+        stats['batches'] += 1
+        logger.info("Backfilled batch ending at content %d (%d rows)", last_id, len(updates))
+    return stats
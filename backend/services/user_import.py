@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import logging
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.models import User
+from services.passwords import password_hasher
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 500
+# Rows not created that an import report lists; the counts cover every row
+MAX_REPORTED_ERRORS = 1000
+REQUIRED_FIELDS = ('username', 'email', 'password')
+USERNAME_MAX_LENGTH = User.__table__.c.username.type.length
+EMAIL_MAX_LENGTH = User.__table__.c.email.type.length
+
+Row = Tuple[int, Dict[str, Any]]
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """Guess the roster format from a file name or a MIME type."""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+        return 'ndjson'
+    return None
+
+
+def iter_roster(stream: BinaryIO, fmt: str) -> Iterator[Row]:
+    """Yield ``(line number, fields)`` from a binary CSV or NDJSON stream, one row at a time.
+
+    Rows that cannot be decoded come out as ``{'_error': ...}`` so they are
+    reported instead of aborting the import.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for fields in reader:
+            # line_num is where the record ended (records may span lines)
+            yield reader.line_num, {
+                str(key).strip().lower(): value for key, value in fields.items() if key is not None
+            }
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield line_number, {'_error': f'Invalid JSON: {e}'}
+            continue
+        if not isinstance(fields, dict):
+            yield line_number, {'_error': 'Each line must be a JSON object'}
+            continue
+        yield line_number, fields
+
+
+def _validate(fields: Dict[str, Any]) -> Optional[str]:
+    if '_error' in fields:
+        return fields['_error']
+    missing = [field for field in REQUIRED_FIELDS if not str(fields.get(field) or '').strip()]
+    if missing:
+        return f"Missing required field(s): {', '.join(missing)}"
+    if len(fields['username']) > USERNAME_MAX_LENGTH:
+        return f'Username longer than {USERNAME_MAX_LENGTH} characters'
+    if len(fields['email']) > EMAIL_MAX_LENGTH:
+        return f'Email longer than {EMAIL_MAX_LENGTH} characters'
+    if '@' not in fields['email']:
+        return 'Invalid email'
+    return None
+
+
+def _existing(column, values: Iterable[str]) -> Set[str]:
+    values = list(values)
+    if not values:
+        return set()
+    return set(db.session.scalars(select(column).where(column.in_(values))))
+
+
+def _result(line: int, fields: Dict[str, Any], status: str, **extra: Any) -> Dict[str, Any]:
+    result = {'line': line, 'email': fields.get('email'), 'username': fields.get('username'), 'status': status}
+    result.update(extra)
+    return result
+
+
+def _insert_chunk(pending: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    hashes = password_hasher.hash_many(fields['password'] for _, fields in pending)
+    rows = [
+        {'username': fields['username'], 'email': fields['email'], 'password_hash': password_hash}
+        for (_, fields), password_hash in zip(pending, hashes)
+    ]
+    try:
+        db.session.execute(insert(User), rows)
+        db.session.commit()
+        return [_result(line, fields, 'created') for line, fields in pending]
+    except IntegrityError:
+        # Someone registered one of these meanwhile (or the database
+        # compares case-insensitively): retry row by row to find out which
+        db.session.rollback()
+
+    results = []
+    for (line, fields), row in zip(pending, rows):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(User), [row])
+            results.append(_result(line, fields, 'created'))
+        except IntegrityError:
+            results.append(_result(line, fields, 'duplicate', error='Email or username already registered'))
+    db.session.commit()
+    return results
+
+
+def _import_chunk(chunk: List[Row], seen_emails: Set[str], seen_usernames: Set[str]) -> List[Dict[str, Any]]:
+    results: Dict[int, Dict[str, Any]] = {}
+    candidates = []
+    for index, (line, fields) in enumerate(chunk):
+        fields = {key: str(value).strip() for key, value in fields.items() if value is not None}
+        error = _validate(fields)
+        if error:
+            results[index] = _result(line, fields, 'invalid', error=error)
+        else:
+            candidates.append((index, line, fields))
+
+    # One query per column for the whole chunk instead of two per row
+    taken_emails = _existing(User.email, {fields['email'] for _, _, fields in candidates})
+    taken_usernames = _existing(User.username, {fields['username'] for _, _, fields in candidates})
+
+    pending, pending_indexes = [], []
+    for index, line, fields in candidates:
+        if fields['email'] in taken_emails or fields['email'] in seen_emails:
+            results[index] = _result(line, fields, 'duplicate', error='Email already registered')
+        elif fields['username'] in taken_usernames or fields['username'] in seen_usernames:
+            results[index] = _result(line, fields, 'duplicate', error='Username already taken')
+        else:
+            seen_emails.add(fields['email'])
+            seen_usernames.add(fields['username'])
+            pending.append((line, fields))
+            pending_indexes.append(index)
+
+    if pending:
+        for index, result in zip(pending_indexes, _insert_chunk(pending)):
+            results[index] = result
+    return [results[index] for index in range(len(chunk))]
+
+
+def import_users(rows: Iterable[Row], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Create the users of a roster, yielding one result per row in input order.
+
+    Rows are consumed ``chunk_size`` at a time: each chunk costs one SELECT
+    per unique column and one multi-row INSERT in its own transaction, so a
+    failure only loses the chunk being written. Only the emails and
+    usernames seen so far are kept, to catch duplicates within the file.
+    Statuses are ``created``, ``duplicate`` and ``invalid``.
+    """
+    seen_emails: Set[str] = set()
+    seen_usernames: Set[str] = set()
+    chunk: List[Row] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _import_chunk(chunk, seen_emails, seen_usernames)
+            chunk = []
+    if chunk:
+        yield from _import_chunk(chunk, seen_emails, seen_usernames)
+
+
+def summarize(results: Iterable[Dict[str, Any]], max_errors: int = MAX_REPORTED_ERRORS) -> Dict[str, Any]:
+    """Count the statuses of ``import_users`` results and keep the first
+    ``max_errors`` rows that were not created, so memory stays bounded."""
+    summary: Dict[str, Any] = {'total': 0, 'created': 0, 'duplicate': 0, 'invalid': 0}
+    errors = []
+    for result in results:
+        summary['total'] += 1
+        summary[result['status']] += 1
+        if result['status'] != 'created' and len(errors) < max_errors:
+            errors.append(result)
+    summary['errors'] = errors
+    summary['errors_truncated'] = summary['duplicate'] + summary['invalid'] > len(errors)
+    return summary
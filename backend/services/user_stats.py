@@ -0,0 +1,131 @@
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.models import Content, UserStats
+
+logger = logging.getLogger(__name__)
+
+# Free generations per user shown as "Credits Remaining" on the dashboard
+GENERATION_CREDITS = int(os.getenv('GENERATION_CREDITS', '100'))
+
+# Counter column of each content type; other types only count in the total
+TYPE_COLUMNS = {
+    'qcm': 'qcm_count',
+    'exercise': 'exercise_count',
+    'summary': 'summary_count',
+}
+
+
+def record_generations(user_id: int, content_types: Iterable[str],
+                       generated_at: Optional[datetime] = None) -> None:
+    """Add new contents to the user's counters, in the caller's transaction.
+
+    The counters are incremented by the database (``col = col + n``) so
+    concurrent generations for the same user never lose an update. The
+    caller commits together with the Content rows it added, and passes
+    their ``created_at`` as ``generated_at`` so that reconciliation, which
+    compares with ``max(Content.created_at)``, finds nothing to correct.
+    """
+    counts = Counter(content_types)
+    total = sum(counts.values())
+    if not total:
+        return
+    generated_at = generated_at or datetime.utcnow()
+
+    values = {
+        'total_generations': UserStats.total_generations + total,
+        # Never move backwards when an older transaction commits last
+        'last_generation_at': case(
+            (UserStats.last_generation_at > generated_at, UserStats.last_generation_at),
+            else_=generated_at
+        ),
+        'updated_at': datetime.utcnow()
+    }
+    for content_type, count in counts.items():
+        column = TYPE_COLUMNS.get(content_type)
+        if column:
+            values[column] = getattr(UserStats, column) + count
+    statement = update(UserStats).where(UserStats.user_id == user_id).values(**values)
+
+    if db.session.execute(statement).rowcount:
+        return
+    # First generation of this user: create the row, unless a concurrent
+    # transaction just did
+    try:
+        with db.session.begin_nested():
+            row = UserStats(user_id=user_id, total_generations=total,
+                            last_generation_at=generated_at)
+            for content_type, count in counts.items():
+                column = TYPE_COLUMNS.get(content_type)
+                if column:
+                    setattr(row, column, count)
+            db.session.add(row)
+    except IntegrityError:
+        db.session.execute(statement)
+
+
+def get_user_stats(user_id: int) -> Dict[str, Any]:
+    """The user's dashboard statistics, read from a single row."""
+    row = db.session.get(UserStats, user_id)
+    if row is None:
+        row = UserStats(user_id=user_id, **_empty_counters())
+    result = row.to_dict()
+    result['credits_total'] = GENERATION_CREDITS
+    result['credits_remaining'] = max(0, GENERATION_CREDITS - row.total_generations)
+    return result
+
+
+def _empty_counters() -> Dict[str, Any]:
+    counters = {column: 0 for column in TYPE_COLUMNS.values()}
+    counters.update(total_generations=0, last_generation_at=None)
+    return counters
+
+
+def reconcile_user_stats(user_id: Optional[int] = None) -> int:
+    """Recompute the counters from ``contents`` and fix rows that drifted.
+
+    Returns the number of users whose row was created or corrected.
+    """
+    query = db.select(
+        Content.user_id, Content.content_type,
+        func.count(Content.id), func.max(Content.created_at)
+    ).group_by(Content.user_id, Content.content_type)
+    if user_id is not None:
+        query = query.where(Content.user_id == user_id)
+
+    expected: Dict[int, Dict[str, Any]] = {}
+    for row_user_id, content_type, count, last_at in db.session.execute(query):
+        stats = expected.setdefault(row_user_id, _empty_counters())
+        stats['total_generations'] += count
+        column = TYPE_COLUMNS.get(content_type)
+        if column:
+            stats[column] += count
+        if last_at and (stats['last_generation_at'] is None or last_at > stats['last_generation_at']):
+            stats['last_generation_at'] = last_at
+
+    existing_query = db.select(UserStats)
+    if user_id is not None:
+        existing_query = existing_query.where(UserStats.user_id == user_id)
+    existing = {row.user_id: row for row in db.session.scalars(existing_query)}
+
+    fixed = 0
+    for row_user_id in set(expected) | set(existing):
+        values = expected.get(row_user_id) or _empty_counters()
+        row = existing.get(row_user_id)
+        if row is None:
+            db.session.add(UserStats(user_id=row_user_id, **values))
+            fixed += 1
+        elif any(getattr(row, name) != value for name, value in values.items()):
+            logger.info("Correcting drifted stats of user %d", row_user_id)
+            for name, value in values.items():
+                setattr(row, name, value)
+            fixed += 1
+    db.session.commit()
+    return fixed
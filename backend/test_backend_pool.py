@@ -0,0 +1,75 @@
+"""Circuit breaker tests for the Ollama backend pool.
+
+Uses a fake client, no Ollama needed:
+
+    cd backend && python -m pytest test_backend_pool.py
+"""
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.backend_pool import BackendPool  # noqa: E402
+from services.resilience import CircuitBreaker, CircuitOpenError  # noqa: E402
+
+
+class FakeClient:
+    base_url = 'http://ollama:11434'
+
+    def tags(self, base_url=None):
+        return [{'name': 'mistral:latest'}]
+
+
+def half_open_pool():
+    pool = BackendPool(FakeClient(), probe_interval=0, breaker_failures=1, breaker_reset=0)
+    breaker = pool.backends[0].breaker
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return pool, breaker
+
+
+def stream(pool):
+    with pool.acquire('mistral:latest'):
+        yield 'chunk'
+        yield 'chunk'
+
+
+def test_stream_closed_during_half_open_releases_probe_slot():
+    pool, breaker = half_open_pool()
+    chunks = stream(pool)
+    next(chunks)
+    # The only probe slot is taken while the stream is open
+    with pytest.raises(CircuitOpenError):
+        with pool.acquire('mistral:latest'):
+            pass
+    chunks.close()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert pool.backends[0].in_flight == 0
+    with pool.acquire('mistral:latest'):
+        pass
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens_circuit():
+    pool, breaker = half_open_pool()
+    breaker.reset_timeout = 60
+    with pytest.raises(requests.exceptions.ConnectionError):
+        with pool.acquire('mistral:latest'):
+            raise requests.exceptions.ConnectionError('refused')
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_unhealthy_backend_retried_after_cooldown_without_probes():
+    pool = BackendPool(FakeClient(), urls=['http://a:11434', 'http://b:11434'],
+                       probe_interval=0, breaker_reset=60)
+    down, up = pool.backends
+    down.mark_unhealthy('connection refused')
+    assert pool._candidates() == [up]
+
+    down.unhealthy_since -= 61
+    assert pool._candidates() == [down, up]
+    assert down.healthy
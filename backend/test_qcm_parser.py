@@ -0,0 +1,60 @@
+"""Tests for the QCM text parser.
+
+Pure parsing, no database or Ollama needed:
+
+    cd backend && python -m pytest test_qcm_parser.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.qcm_parser import parse_qcm  # noqa: E402
+
+
+def qcm(answer, header='QUESTION:', options=('A cell wall', 'A nucleus', 'Chloroplasts', 'Mitochondria')):
+    lines = [f'{header} Which structure surrounds a plant cell?', 'OPTIONS:']
+    lines += [f'{number}. {option}' for number, option in enumerate(options, start=1)]
+    lines += [f'CORRECT_ANSWER: {answer}', 'EXPLANATION: Plant cells have a rigid wall.']
+    return '\n'.join(lines)
+
+
+@pytest.mark.parametrize('answer, index', [
+    ('1', 0), ('3', 2), ('3.', 2), ('(2)', 1),
+    ('B', 1), ('b)', 1), ('C.', 2), ('(D)', 3), ('D) Mitochondria', 3),
+])
+def test_answer_given_as_number_or_letter(answer, index):
+    assert parse_qcm(qcm(answer)).answer_index == index
+
+
+@pytest.mark.parametrize('answer, index', [
+    ('A cell wall', 0), ('a cell wall.', 0), ('A nucleus', 1), ('  Mitochondria ', 3),
+])
+def test_answer_given_as_option_text(answer, index):
+    assert parse_qcm(qcm(answer)).answer_index == index
+
+
+def test_answer_starting_with_article_is_not_a_letter():
+    parsed = parse_qcm(qcm('A membrane'))
+    assert parsed.answer_index is None
+    assert "does not match an option" in parsed.diagnostics[0]
+
+
+@pytest.mark.parametrize('header', ['Question 1:', '**Question 1:**', '## QUESTION 2', 'Question #3:'])
+def test_numbered_question_header(header):
+    text = qcm('2', header=header)
+    if not header.endswith(':') and not header.endswith('**'):
+        # A header without a colon carries its text on the next line
+        text = text.replace(f'{header} ', f'{header}\n')
+    parsed = parse_qcm(text)
+    assert parsed.missing_sections == []
+    assert parsed.question == 'Which structure surrounds a plant cell?'
+    parsed.validate()
+
+
+def test_question_text_is_not_a_header():
+    parsed = parse_qcm('QUESTION:\nQuestion 2 asks about cells\nOPTIONS:\n1. a\n2. b\n3. c\n4. d\n'
+                       'CORRECT_ANSWER: 1\nEXPLANATION: because')
+    assert parsed.question == 'Question 2 asks about cells'
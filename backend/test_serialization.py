@@ -0,0 +1,103 @@
+"""Query-count tests for the listing serializers.
+
+Runs on an in-memory SQLite database, no MySQL or Ollama needed:
+
+    cd backend && python -m pytest test_serialization.py
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from extensions import db  # noqa: E402
+from models.models import Content, Request, User  # noqa: E402
+from services.serializers import DEEP, SHALLOW, list_requests, list_users  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def add_user(index, requests=3, contents_per_request=2):
+    user = User(username=f'user{index}', email=f'user{index}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    for r in range(requests):
+        request_obj = Request(user_id=user.id, topic=f'topic {r}', level='3')
+        db.session.add(request_obj)
+        db.session.flush()
+        for c in range(contents_per_request):
+            db.session.add(Content(user_id=user.id, request_id=request_obj.id, title=f'QCM {r}.{c}',
+                                   content_type='qcm', content_data='QUESTION: ...'))
+    db.session.commit()
+    return user
+
+
+def listing_queries(fn):
+    db.session.expire_all()
+    with count_queries() as statements:
+        fn()
+    return len(statements)
+
+
+@pytest.mark.parametrize('view, expected', [(SHALLOW, 1), (DEEP, 2)])
+def test_list_requests_query_count_is_constant(app, view, expected):
+    small_user_id = add_user(0, requests=2).id
+    large_user_id = add_user(1, requests=40, contents_per_request=3).id
+
+    small = listing_queries(lambda: list_requests(small_user_id, view=view, limit=100))
+    large = listing_queries(lambda: list_requests(large_user_id, view=view, limit=100))
+
+    assert small == large == expected
+
+
+@pytest.mark.parametrize('view, expected', [(SHALLOW, 1), (DEEP, 3)])
+def test_list_users_query_count_is_constant(app, view, expected):
+    add_user(0)
+    small = listing_queries(lambda: list_users(view))
+
+    for index in range(1, 25):
+        add_user(index)
+    large = listing_queries(lambda: list_users(view))
+
+    assert small == large == expected
+
+
+def test_deep_request_view_includes_shallow_contents(app):
+    user_id = add_user(0, requests=1, contents_per_request=2).id
+    db.session.expire_all()
+
+    with count_queries() as statements:
+        [request_data] = list_requests(user_id, view=DEEP)
+
+    assert len(request_data['contents']) == 2
+    assert 'content_data' not in request_data['contents'][0]
+    # The heavy columns are not even selected
+    assert not any('content_data' in statement for statement in statements)
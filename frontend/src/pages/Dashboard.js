@@ -1,4 +1,4 @@
-import React from "react";
+import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import {
   Container,
@@ -15,6 +15,7 @@ import {
   useColorModeValue,
 } from "@chakra-ui/react";
 import { useAuth } from "../contexts/AuthContext";
+import axios from "../utils/axios";
 
 function Dashboard() {
   const { currentUser } = useAuth();
@@ -23,6 +24,18 @@ function Dashboard() {
   const borderColor = useColorModeValue("brand.200", "brand.700");
   const textColor = useColorModeValue("brand.700", "brand.100");
   const statBgColor = useColorModeValue("white", "brand.800");
+  const [stats, setStats] = useState(null);
+
+  useEffect(() => {
+    axios
+      .get("/api/content/stats")
+      .then((response) => setStats(response.data))
+      .catch((error) => console.error("Error fetching stats:", error));
+  }, []);
+
+  const lastGeneration = stats?.last_generation_at
+    ? new Date(stats.last_generation_at)
+    : null;
 
   return (
     <Container maxW="container.xl" py={10}>
@@ -46,7 +59,9 @@ function Dashboard() {
             bg={statBgColor}
           >
             <StatLabel color={textColor}>Total Generations</StatLabel>
-            <StatNumber color="brand.500">0</StatNumber>
+            <StatNumber color="brand.500">
+              {stats?.total_generations ?? 0}
+            </StatNumber>
             <StatHelpText color={textColor}>Since you joined</StatHelpText>
           </Stat>
 
@@ -59,7 +74,9 @@ function Dashboard() {
             bg={statBgColor}
           >
             <StatLabel color={textColor}>Credits Remaining</StatLabel>
-            <StatNumber color="brand.500">100</StatNumber>
+            <StatNumber color="brand.500">
+              {stats?.credits_remaining ?? 100}
+            </StatNumber>
             <StatHelpText color={textColor}>Free credits</StatHelpText>
           </Stat>
 
@@ -72,8 +89,14 @@ function Dashboard() {
             bg={statBgColor}
           >
             <StatLabel color={textColor}>Last Generation</StatLabel>
-            <StatNumber color="brand.500">-</StatNumber>
-            <StatHelpText color={textColor}>No generations yet</StatHelpText>
+            <StatNumber color="brand.500">
+              {lastGeneration ? lastGeneration.toLocaleDateString() : "-"}
+            </StatNumber>
+            <StatHelpText color={textColor}>
+              {lastGeneration
+                ? lastGeneration.toLocaleTimeString()
+                : "No generations yet"}
+            </StatHelpText>
           </Stat>
         </SimpleGrid>
 